@@ -0,0 +1,96 @@
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+from typing import List, NamedTuple
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+
+log = logging.getLogger("BannerProcessing")
+
+BANNER_WIDTHS = (480, 960, 1920)
+MIN_BANNER_SIZE = (300, 100)  # width, height
+MAX_BANNER_PIXELS = 40_000_000  # Decompression bomb guard, checked before decoding
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+BANNER_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
+
+class InvalidBanner(Exception):
+    """Raised when an uploaded banner can't be decoded or has unsupported dimensions."""
+
+
+class BannerVariant(NamedTuple):
+    width: int
+    format: str  # "webp" or "jpeg"
+    content_type: str
+    data: bytes
+
+
+def process_banner(path: str) -> List[BannerVariant]:
+    """Decodes the banner file at path and encodes it as WebP and JPEG at each of BANNER_WIDTHS.
+
+    Widths above the image's own width are skipped, and an image narrower
+    than every width gets one variant at its own width. Variants are encoded
+    from the decoded pixels only, so EXIF, ICC and other metadata are
+    dropped. Animated images use their first frame. CPU bound, runs in the
+    process pool, which reads the file itself so the banner isn't sent
+    between processes.
+    """
+    try:
+        image = Image.open(path)
+        width, height = image.size
+        if width * height > MAX_BANNER_PIXELS:
+            raise InvalidBanner(f"image is {width}x{height}, larger than {MAX_BANNER_PIXELS // 1_000_000} megapixels")
+        image.load()
+    except InvalidBanner:
+        raise
+    except Exception as e:
+        raise InvalidBanner(f"could not decode image ({e})")
+
+    image = ImageOps.exif_transpose(image)
+    width, height = image.size
+    if width < MIN_BANNER_SIZE[0] or height < MIN_BANNER_SIZE[1]:
+        raise InvalidBanner(f"image is {width}x{height}, at least {MIN_BANNER_SIZE[0]}x{MIN_BANNER_SIZE[1]} is required")
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+
+    widths = [target for target in BANNER_WIDTHS if target <= width] or [width]
+    variants = []
+    # Resize from the largest width down, each step from the previous result, which is much cheaper
+    for target in sorted(widths, reverse=True):
+        if target != image.width:
+            image = image.resize((target, max(1, round(height * target / width))), Image.Resampling.LANCZOS)
+
+        webp = io.BytesIO()
+        image.save(webp, "WEBP", quality=WEBP_QUALITY, method=4)
+        variants.append(BannerVariant(target, "webp", "image/webp", webp.getvalue()))
+
+        jpeg = io.BytesIO()
+        flat = image
+        if has_alpha:
+            flat = Image.new("RGB", image.size, (0, 0, 0))
+            flat.paste(image, mask=image.getchannel("A"))
+        flat.save(jpeg, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        variants.append(BannerVariant(target, "jpeg", "image/jpeg", jpeg.getvalue()))
+    return variants
+
+
+class BannerProcessor:
+    """Runs process_banner in a pool of worker processes.
+
+    Workers are spawned rather than forked, since the bot process runs
+    gRPC threads for Firestore that don't survive a fork.
+    """
+
+    def __init__(self, max_workers: int = BANNER_WORKERS):
+        self.pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def process(self, path: str) -> List[BannerVariant]:
+        """Returns the banner variants for the file at path. Raises InvalidBanner."""
+        return await asyncio.get_running_loop().run_in_executor(self.pool, process_banner, path)
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -1,10 +1,12 @@
 from discord.ext import commands
 from aiohttp import ClientSession
+from http_client import HttpClient
 from typing import Optional
 import discord
 
 class CustomBot(commands.Bot):
     web_session: ClientSession = None
+    web_client: HttpClient = None  # Retries, circuit breakers and latency stats on top of web_session
     notification_channel: discord.TextChannel = None
 
     def __init__(
@@ -15,11 +17,13 @@ class CustomBot(commands.Bot):
     ):
         super().__init__(*args, **kwargs)
         self.web_session = web_session
+        self.web_client = HttpClient(web_session)
         cogs_list = [
             'leaderboard',
             'translator',
             'notifier',
             'profile-creator',
+            'diagnostics',
         ]
 
         for cog in cogs_list:
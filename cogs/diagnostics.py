@@ -0,0 +1,25 @@
+import discord
+from discord.ext import commands
+from discord.ext.commands import has_role
+from bot import CustomBot
+
+
+class Diagnostics(commands.Cog):
+    """Statistics about the bot's outbound HTTP traffic."""
+
+    def __init__(self, bot: CustomBot):
+        self.bot = bot
+
+    @commands.guild_only()
+    @has_role("Admin")
+    @discord.slash_command(name="http_stats", description="Show request counts, latencies and circuit states per endpoint.")
+    async def http_stats(self, ctx: discord.ApplicationContext):
+        stats = self.bot.web_client.stats()
+        if not stats:
+            await ctx.send_response("No requests have been made yet.", ephemeral=True)
+            return
+        await ctx.send_response("\n".join(f"**{name}**: {value}" for name, value in stats.items()), ephemeral=True)
+
+
+def setup(bot: CustomBot) -> None:
+    bot.add_cog(Diagnostics(bot))
@@ -1,26 +1,133 @@
+import asyncio
+import csv
+import io
 import json
 import discord
 from discord.ext import commands, tasks
 from discord.commands import option
-from typing import List
+from discord.ext.commands import has_role
+from typing import Dict, List
 from bot import CustomBot
-from datetime import datetime
+from datetime import datetime, timezone
 from table2ascii import table2ascii as t2a, PresetStyle
-import os
 import logging
 from typing import Tuple
 from firestore_helper import get_firestore_client
-from fuzzywuzzy import fuzz
+from leaderboard_model import LeaderboardModel, ClanEntry, CLANS_CATEGORY
+from leaderboard_history import LeaderboardHistory, HISTORY_RETENTION_DAYS
+from http_client import CircuitOpen
 
 LEADERBOARD_URL = "https://publicapi.battlebit.cloud/Leaderboard/Get"
+LEADERBOARD_CATEGORIES = ["TopClans", "MostXP", "MostHeals", "MostRevives", "MostVehiclesDestroyed", "MostVehicleRepairs", "MostRoadkills", "MostLongestKill", "MostObjectivesComplete", "MostKills"]
+ALL_CATEGORIES = "All"
+HOME_CLAN_TAG = "1S1K"
+MESSAGE_LIMIT = 2000
+ROWS_PER_PAGE = 15
+EXPORT_CACHE_SIZE = 16  # Distinct (n, min_players) renders kept per leaderboard version
+HISTORY_SAMPLE_INTERVAL = 60 * 60  # Seconds between two snapshots written to the history store
 log = logging.getLogger("Leaderboard")
 
+class TopClansExport:
+    """Top clans rendered once per leaderboard version.
+
+    Pages and downloads are produced lazily in memory and cached, so repeated
+    /topclans calls and button presses don't render anything twice.
+    """
+
+    HEADER = ["Rank", "Clan", "Tag", "Total XP", "Players", "XP/player"]
+
+    def __init__(self, rows: List[list], records: List[dict]):
+        self.rows = rows
+        self.records = records
+        self._pages: List[str] = None
+        self._files: Dict[str, bytes] = {}  # format -> file content
+
+    def pages(self) -> List[str]:
+        """Returns the table split into messages that fit Discord's message limit."""
+        if self._pages is None:
+            table = self._render(self.rows)
+            if len(table) + 6 <= MESSAGE_LIMIT:
+                self._pages = [f"```{table}```"]
+            else:
+                chunks = [self.rows[i:i + ROWS_PER_PAGE] for i in range(0, len(self.rows), ROWS_PER_PAGE)]
+                self._pages = [
+                    f"```{self._render(chunk)}\nPage {i + 1}/{len(chunks)}```"
+                    for i, chunk in enumerate(chunks)
+                ]
+        return self._pages
+
+    def file(self, format: str) -> bytes:
+        """Returns the whole table as a txt, csv or json file."""
+        if format not in self._files:
+            if format == "csv":
+                buffer = io.StringIO()
+                writer = csv.DictWriter(buffer, fieldnames=list(self.records[0].keys()) if self.records else [])
+                writer.writeheader()
+                writer.writerows(self.records)
+                content = buffer.getvalue()
+            elif format == "json":
+                content = json.dumps(self.records, ensure_ascii=False, indent=2)
+            else:
+                content = self._render(self.rows)
+            self._files[format] = content.encode("utf-8-sig" if format == "txt" else "utf-8")
+        return self._files[format]
+
+    def _render(self, rows: List[list]) -> str:
+        return t2a(header=self.HEADER, body=rows, style=PresetStyle.thin_compact)
+
+
+class TopClansPages(discord.ui.View):
+    """Paginated /topclans message with downloads of the full table."""
+
+    def __init__(self, export: TopClansExport):
+        super().__init__(timeout=300)
+        self.export = export
+        self.page = 0
+
+    async def _show_page(self, interaction: discord.Interaction, page: int) -> None:
+        pages = self.export.pages()
+        self.page = page % len(pages)
+        await interaction.response.edit_message(content=pages[self.page], view=self)
+
+    async def _send_file(self, interaction: discord.Interaction, format: str) -> None:
+        file = discord.File(io.BytesIO(self.export.file(format)), f"leaderboard.{format}")
+        await interaction.response.send_message(file=file, ephemeral=True)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, button: discord.ui.Button, interaction: discord.Interaction) -> None:
+        await self._show_page(interaction, self.page - 1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, button: discord.ui.Button, interaction: discord.Interaction) -> None:
+        await self._show_page(interaction, self.page + 1)
+
+    @discord.ui.button(label="TXT", style=discord.ButtonStyle.primary)
+    async def download_txt(self, button: discord.ui.Button, interaction: discord.Interaction) -> None:
+        await self._send_file(interaction, "txt")
+
+    @discord.ui.button(label="CSV", style=discord.ButtonStyle.primary)
+    async def download_csv(self, button: discord.ui.Button, interaction: discord.Interaction) -> None:
+        await self._send_file(interaction, "csv")
+
+    @discord.ui.button(label="JSON", style=discord.ButtonStyle.primary)
+    async def download_json(self, button: discord.ui.Button, interaction: discord.Interaction) -> None:
+        await self._send_file(interaction, "json")
+
+
 class Leaderboard(commands.Cog):
     def __init__(self, bot: CustomBot):
         self.bot : CustomBot = bot
         self.last_fetch: datetime
-        self.last_cached_leaderboard: List[dict] = None
-        self.cached_leaderboard: List[dict] = None
+        self.previous_leaderboard: LeaderboardModel = None
+        self.leaderboard: LeaderboardModel = None
+        self.leaderboard_version = 0  # Bumped whenever the fetched payload changes
+        self.last_payload_hash: int = None
+        self.export_cache: Dict[Tuple[int, int], TopClansExport] = {}  # (n, min_players) -> export for export_cache_version
+        self.export_cache_version = -1
+        self.history = LeaderboardHistory()
+        self.last_history_sample = 0
+        self.watchlist: List[str] = [HOME_CLAN_TAG]  # Clan tags whose global rank is tracked
+        self.watched_ranks: Dict[str, int] = {}  # tag -> last persisted rank, 0 when unranked
         self.db = get_firestore_client()
         self.notification_channel : discord.TextChannel = None
 
@@ -29,8 +136,14 @@ class Leaderboard(commands.Cog):
         log.info("Leaderboard cog is ready")
         self.notification_channel = await self.bot.get_notification_channel()
 
-        if not self.db.collection("clan").document("statistics").get().to_dict().get("global_rank"):
-            self.db.collection("clan").document("statistics").set({"global_rank": 0})
+        statistics = self.db.collection("clan").document("statistics").get().to_dict() or {}
+        watchlist = self.db.collection("clan").document("watchlist").get().to_dict() or {}
+        self.watchlist = watchlist.get("tags", [HOME_CLAN_TAG])
+        self.watched_ranks = statistics.get("global_ranks", {})
+        if "global_ranks" not in statistics and statistics.get("global_rank"):
+            self.watched_ranks[HOME_CLAN_TAG] = statistics["global_rank"]
+        if not statistics:
+            self.db.collection("clan").document("statistics").set({"global_rank": 0, "global_ranks": {}})
         
         self.fetch_leaderboard_loop.start()
         
@@ -43,22 +156,48 @@ class Leaderboard(commands.Cog):
     async def leaderboard(
         self, ctx: discord.ApplicationContext, n: int = 10, min_players: int = 3
     ) -> None:
-        top_clans = self.cached_leaderboard[0]["TopClans"]
+        if not self.leaderboard:
+            await ctx.send_response("Leaderboard data not available yet. Please try again in a few seconds.")
+            return
 
+        export = self.get_top_clans_export(n, min_players)
+        pages = export.pages()
+
+        if len(pages) == 1:
+            await ctx.send_response(pages[0])
+            return
+
+        await ctx.send_response(pages[0], view=TopClansPages(export))
+
+    def get_top_clans_export(self, n: int, min_players: int) -> TopClansExport:
+        """Returns the rendered top clans for this leaderboard version, building it on first use."""
+        if self.export_cache_version != self.leaderboard_version:
+            self.export_cache = {}
+            self.export_cache_version = self.leaderboard_version
+
+        key = (n, min_players)
+        if key not in self.export_cache:
+            if len(self.export_cache) >= EXPORT_CACHE_SIZE:
+                self.export_cache.pop(next(iter(self.export_cache)))
+            self.export_cache[key] = self.build_top_clans_export(n, min_players)
+        return self.export_cache[key]
+
+    def build_top_clans_export(self, n: int, min_players: int) -> TopClansExport:
         cleaned_data = [
-            clan for clan in top_clans if int(clan["MaxPlayers"]) > min_players
+            clan for clan in self.leaderboard.clans if clan.max_players > min_players
         ]
         
         sorted_data = sorted(
             cleaned_data,
-            key=lambda x: int(x["XP"]) / int(x["MaxPlayers"]),
+            key=lambda x: x.xp_per_player,
             reverse=True,
         )
 
         max_n = min(n, len(sorted_data))
         data = []
+        records = []
         for i, clan in enumerate(sorted_data[:max_n]):
-            xp_per_player = int(clan["XP"]) / int(clan["MaxPlayers"])
+            xp_per_player = clan.xp_per_player
             arrow, prev_xp_per_player = self.get_arrow_and_prev_xp_per_player(clan)
 
             prev_score_str = ""
@@ -72,44 +211,34 @@ class Leaderboard(commands.Cog):
             data.append(
                 [
                     f"{i+1}",
-                    f"{clan['Clan']} {arrow}",
-                    clan["Tag"],
-                    self.format_number(clan["XP"]),
-                    clan["MaxPlayers"],
+                    f"{clan.clan} {arrow}",
+                    clan.tag,
+                    self.format_number(clan.xp),
+                    clan.max_players,
                     f"{self.format_number(xp_per_player)} {prev_score_str}",
                 ]
             )
+            records.append({
+                "rank": i + 1,
+                "clan": clan.clan,
+                "tag": clan.tag,
+                "xp": clan.xp,
+                "players": clan.max_players,
+                "xp_per_player": xp_per_player,
+                "previous_xp_per_player": prev_xp_per_player,
+            })
 
-        table = t2a(
-            header=["Rank", "Clan", "Tag", "Total XP", "Players", "XP/player"],
-            body=data,
-            style=PresetStyle.thin_compact,
-        )
-
-        message = f"```{table}```"
+        return TopClansExport(data, records)
 
-        try:
-            await ctx.send_response(message)
-        except discord.HTTPException:
-            if os.path.exists("leaderboard.txt"):
-                os.remove("leaderboard.txt")
-            with open("leaderboard.txt", "w", encoding="utf-8-sig") as f:
-                f.write(message)
-            with open("leaderboard.txt", "rb") as f:
-                await ctx.send_response(
-                    "Leaderboard is too long, sending as a file",
-                    file=discord.File(f, "leaderboard.txt"))
-    def get_arrow_and_prev_xp_per_player(self, clan) -> Tuple[str, float]:
-        prev_xp_per_player = 0
-        if self.last_cached_leaderboard is not None:
-            for old_clan in self.last_cached_leaderboard[0]["TopClans"]:
-                if old_clan["Tag"] == clan["Tag"]:
-                    prev_xp_per_player = int(old_clan["XP"]) / int(
-                        old_clan["MaxPlayers"]
-                    )
-                    if int(clan["XP"]) > int(old_clan["XP"]):
-                        return "▲", prev_xp_per_player
-        return "", prev_xp_per_player
+    def get_arrow_and_prev_xp_per_player(self, clan: ClanEntry) -> Tuple[str, float]:
+        if self.previous_leaderboard is None:
+            return "", 0
+        old_clan = self.previous_leaderboard.entry(CLANS_CATEGORY, clan.tag)
+        if old_clan is None:
+            return "", 0
+        if clan.xp > old_clan.xp:
+            return "▲", old_clan.xp_per_player
+        return "", old_clan.xp_per_player
 
     def format_number(self, num):
         return f"{float(num):,.2f}"
@@ -118,61 +247,210 @@ class Leaderboard(commands.Cog):
     async def fetch_leaderboard_loop(self) -> None:
 
         log.info("Fetching leaderboard...")
-        async with self.bot.web_session.get(LEADERBOARD_URL) as response:
-            if response.status != 200:
-                log.error(f"Failed to fetch leaderboard: {response.status}")
-                return
+        try:
+            response = await self.bot.web_client.get(LEADERBOARD_URL, endpoint="leaderboard")
+        except CircuitOpen as e:
+            log.warning(f"Skipping leaderboard fetch: {e}")
+            return
+        if response.status != 200:
+            log.error(f"Failed to fetch leaderboard: {response.status}")
+            return
+
+        payload = response.text(encoding="utf-8-sig")
+        self.last_fetch = datetime.now()
+
+        # The model is only rebuilt when the payload changed
+        payload_hash = hash(payload)
+        if payload_hash == self.last_payload_hash:
+            return
+        self.last_payload_hash = payload_hash
+        self.leaderboard_version += 1
+
+        leaderboard = LeaderboardModel.from_payload(json.loads(payload), self.leaderboard_version)
+        self.previous_leaderboard = self.leaderboard or leaderboard
+        self.leaderboard = leaderboard
+
+        await self.record_history(leaderboard)
+
+        await self.update_watched_ranks(leaderboard)
+
+    async def update_watched_ranks(self, leaderboard: LeaderboardModel) -> None:
+        """Persists the ranks of watched clans and announces every change in one embed."""
+        changes = []
+        new_ranks = {}
+        for tag in self.watchlist:
+            new_rank = leaderboard.rank(CLANS_CATEGORY, tag)
+            new_ranks[tag] = new_rank
+            previous_rank = self.watched_ranks.get(tag)
+            # Newly watched clans are recorded without an announcement
+            if previous_rank is not None and previous_rank != new_rank:
+                changes.append((tag, previous_rank, new_rank))
+
+        if new_ranks == self.watched_ranks:
+            return
+
+        self.watched_ranks = new_ranks
+        statistics = {"global_ranks": new_ranks}
+        if HOME_CLAN_TAG in new_ranks:
+            statistics["global_rank"] = new_ranks[HOME_CLAN_TAG]
+        self.db.collection("clan").document("statistics").update(statistics)
 
-            leaderboard = json.loads(await response.text(encoding="utf-8-sig"))
+        if changes:
+            await self.send_rank_changes(changes)
 
-            if self.cached_leaderboard is None:
-                self.last_cached_leaderboard = self.cached_leaderboard = leaderboard
+    async def send_rank_changes(self, changes: List[Tuple[str, int, int]]) -> None:
+        improved_count = sum(1 for _, previous_rank, new_rank in changes if self.rank_improved(previous_rank, new_rank))
+        embed = discord.Embed(
+            title="🌟 Global Rank Update 🌟",
+            description=f"{len(changes)} watched clan{'s' if len(changes) > 1 else ''} changed rank.",
+            color=discord.Color.green() if improved_count * 2 >= len(changes) else discord.Color.red(),
+            timestamp=discord.utils.utcnow(),
+        )
+        for tag, previous_rank, new_rank in changes[:25]:  # Discord allows 25 fields per embed
+            improved = self.rank_improved(previous_rank, new_rank)
+            direction = "⬆️" if improved else "⬇️"
+            if previous_rank and new_rank:
+                change_str = f"{direction} `{'+' if improved else '-'}{abs(new_rank - previous_rank)}`"
             else:
-                self.last_cached_leaderboard = self.cached_leaderboard
-                self.cached_leaderboard = leaderboard
-
-            self.last_fetch = datetime.now()
-
-        top_clans = leaderboard[0]["TopClans"]
-        previous_rank = self.db.collection("clan").document("statistics").get().to_dict().get("global_rank", 0)
-        for rank, clan in enumerate(top_clans):
-            if clan["Tag"] == "1S1K":
-                new_rank = rank + 1
-                if new_rank != previous_rank:
-                    self.db.collection("clan").document("statistics").set({"global_rank": new_rank})
-                    try:
-                        rank_difference = abs(new_rank - previous_rank)
-                        improved = new_rank < previous_rank
-                        direction = "⬆️" if improved else "⬇️"
-                        change_str = f"{direction} `{'+' if improved else '-'}{rank_difference}`"
-                        embed = discord.Embed(
-                            title="🌟 Global Rank Update 🌟",
-                            description=(
-                                f"1S1K's global rank has **{'improved' if improved else 'dropped'}**!"
-                            ),
-                            color=discord.Color.green() if improved else discord.Color.red(),
-                            timestamp=discord.utils.utcnow(),
-                        )
-                        embed.add_field(
-                            name="Previous Rank",
-                            value=f"`#{previous_rank}`",
-                            inline=True
-                        )
-                        embed.add_field(
-                            name="New Rank",
-                            value=f"`#{new_rank}`",
-                            inline=True
-                        )
-                        embed.add_field(
-                            name="Change",
-                            value=change_str,
-                            inline=False
-                        )
-
-                        await self.notification_channel.send(":loudspeaker: • @everyone", embed=embed)
-                            
-                    except Exception as e:
-                        log.warning(f"Cannot send notification to channel {self.notification_channel}. Exception: {e}")
+                change_str = direction
+            embed.add_field(
+                name=tag,
+                value=f"`{self.format_rank(previous_rank)}` → `{self.format_rank(new_rank)}` {change_str}",
+                inline=False
+            )
+
+        try:
+            await self.notification_channel.send(":loudspeaker: • @everyone", embed=embed)
+        except Exception as e:
+            log.warning(f"Cannot send notification to channel {self.notification_channel}. Exception: {e}")
+
+    def rank_improved(self, previous_rank: int, new_rank: int) -> bool:
+        if not previous_rank or not new_rank:
+            return bool(new_rank)
+        return new_rank < previous_rank
+
+    def format_rank(self, rank: int) -> str:
+        return f"#{rank}" if rank else "Unranked"
+
+    @commands.guild_only()
+    @commands.slash_command(name="watchlist", description="Show the clans whose global rank is tracked")
+    async def show_watchlist(self, ctx: discord.ApplicationContext) -> None:
+        data = [[tag, self.format_rank(self.watched_ranks.get(tag, 0))] for tag in self.watchlist]
+        if not data:
+            await ctx.send_response("No clans are being watched.", ephemeral=True)
+            return
+        table = t2a(header=["Tag", "Rank"], body=data, style=PresetStyle.thin_compact)
+        await ctx.send_response(f"```{table}```")
+
+    @commands.guild_only()
+    @has_role("Admin")
+    @commands.slash_command(name="watchlist_add", description="Track the global rank of a clan")
+    @option("tag", "Clan tag", type=str, required=True)
+    async def watchlist_add(self, ctx: discord.ApplicationContext, tag: str) -> None:
+        if tag in self.watchlist:
+            await ctx.send_response(f"{tag} is already being watched.", ephemeral=True)
+            return
+        self.watchlist.append(tag)
+        self.db.collection("clan").document("watchlist").set({"tags": self.watchlist})
+        await ctx.send_response(f"{tag} has been added to the watchlist.", ephemeral=True)
+
+    @commands.guild_only()
+    @has_role("Admin")
+    @commands.slash_command(name="watchlist_remove", description="Stop tracking the global rank of a clan")
+    @option("tag", "Clan tag", type=str, required=True)
+    async def watchlist_remove(self, ctx: discord.ApplicationContext, tag: str) -> None:
+        if tag not in self.watchlist:
+            await ctx.send_response(f"{tag} is not being watched.", ephemeral=True)
+            return
+        self.watchlist.remove(tag)
+        self.db.collection("clan").document("watchlist").set({"tags": self.watchlist})
+        await ctx.send_response(f"{tag} has been removed from the watchlist.", ephemeral=True)
+
+    async def record_history(self, leaderboard: LeaderboardModel) -> None:
+        """Writes a snapshot to the history store at most once per HISTORY_SAMPLE_INTERVAL."""
+        now = int(datetime.now(timezone.utc).timestamp())
+        if now - self.last_history_sample < HISTORY_SAMPLE_INTERVAL:
+            return
+        self.last_history_sample = now
+
+        try:
+            await asyncio.to_thread(self.history.record, leaderboard, now)
+            size, segments = await asyncio.to_thread(self.history.usage)
+            log.info(f"Recorded leaderboard history snapshot. Store size: {size / 1024 / 1024:.2f} MiB in {segments} segments")
+        except Exception as e:
+            log.error(f"Failed to record leaderboard history: {e}")
+
+    @commands.guild_only()
+    @commands.slash_command(
+        name="clan_history",
+        description="Show a clan's daily rank and XP history",
+    )
+    @option("tag", "Clan tag", type=str, required=True)
+    @option("days", "Number of days to show", type=int, required=False, min_value=1, max_value=HISTORY_RETENTION_DAYS)
+    async def clan_history(self, ctx: discord.ApplicationContext, tag: str, days: int = HISTORY_RETENTION_DAYS) -> None:
+        await ctx.defer()
+        await self._send_history(ctx, CLANS_CATEGORY, tag, days, f"History for clan {tag}", "XP")
+
+    @commands.guild_only()
+    @commands.slash_command(
+        name="player_history",
+        description="Show a player's daily rank and value history in a leaderboard category",
+    )
+    @option(
+        name="category",
+        description="The category to show",
+        type=str,
+        required=True,
+        autocomplete=discord.utils.basic_autocomplete(LEADERBOARD_CATEGORIES[1:])
+    )
+    @option("name", "Player name", type=str, required=True)
+    @option("days", "Number of days to show", type=int, required=False, min_value=1, max_value=HISTORY_RETENTION_DAYS)
+    async def player_history(self, ctx: discord.ApplicationContext, category: str, name: str, days: int = HISTORY_RETENTION_DAYS) -> None:
+        await ctx.defer()
+        if category not in LEADERBOARD_CATEGORIES[1:]:
+            await ctx.send_followup(f"Invalid category: {category}")
+            return
+        await self._send_history(ctx, category, name, days, f"History for {name} in {category}", "Value")
+
+    async def _send_history(self, ctx, category: str, name: str, days: int, title: str, value_header: str) -> None:
+        try:
+            series = await asyncio.to_thread(self.history.read_series, category, name, days)
+            size, segments = await asyncio.to_thread(self.history.usage)
+        except Exception as e:
+            log.error(f"Error reading leaderboard history: {e}")
+            await ctx.send_followup("An error occurred while reading the leaderboard history.")
+            return
+
+        if not series:
+            await ctx.send_followup(f"No history found for '{name}' in {category}.")
+            return
+
+        # Keep the last sample of each day
+        daily = {}
+        for timestamp, rank, value in series:
+            day = datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+            daily[day] = (rank, value)
+
+        data = []
+        previous_value = None
+        for day, (rank, value) in daily.items():
+            change = "" if previous_value is None else f"{value - previous_value:+,.2f}"
+            data.append([day, f"#{rank}", self.format_number(value), change])
+            previous_value = value
+
+        table = t2a(
+            header=["Date", "Rank", value_header, "Change"],
+            body=data,
+            style=PresetStyle.thin_compact,
+        )
+        footer = f"History store: {size / 1024 / 1024:.1f} MiB in {segments} segments"
+        message = f"```\n{title}:\n{table}\n{footer}```"
+        if len(message) <= 2000:
+            await ctx.send_followup(message)
+        else:
+            await ctx.send_followup(
+                f"{title} is too long, sending as a file",
+                file=discord.File(io.BytesIO(f"{table}\n{footer}".encode("utf-8-sig")), "history.txt"))
 
     @commands.guild_only()
     @commands.slash_command(
@@ -184,7 +462,7 @@ class Leaderboard(commands.Cog):
         description="The category to search in",
         type=str,
         required=True,
-        autocomplete=discord.utils.basic_autocomplete(["TopClans", "MostXP", "MostHeals", "MostRevives", "MostVehiclesDestroyed", "MostVehicleRepairs", "MostRoadkills", "MostLongestKill", "MostObjectivesComplete", "MostKills"])
+        autocomplete=discord.utils.basic_autocomplete(LEADERBOARD_CATEGORIES + [ALL_CATEGORIES])
     )
     async def leaderboard_search(
         self, 
@@ -197,99 +475,93 @@ class Leaderboard(commands.Cog):
         await ctx.defer()
         
         try:
-            if not self.cached_leaderboard:
+            leaderboard = self.leaderboard
+            if not leaderboard:
                 await ctx.send_followup("Leaderboard data not available yet. Please try again in a few seconds.")
                 return
 
-            category_index = next((i for i, item in enumerate(self.cached_leaderboard) 
-                                 if list(item.keys())[0] == category), None)
-            
-            if category_index is None:
+            if category != ALL_CATEGORIES and category not in leaderboard:
                 await ctx.send_followup(f"Invalid category: {category}")
                 return
 
-            if category == "TopClans":
-                await self._search_clans(ctx, query, max_results, min_similarity)
+            if category == ALL_CATEGORIES:
+                await self._search_all(ctx, leaderboard, query, max_results, min_similarity)
+            elif category == CLANS_CATEGORY:
+                await self._search_clans(ctx, leaderboard, query, max_results, min_similarity)
             else:
-                await self._search_players(ctx, category, query, max_results, min_similarity)
+                await self._search_players(ctx, leaderboard, category, query, max_results, min_similarity)
 
         except Exception as e:
             log.error(f"Error in leaderboard search: {e}")
             await ctx.send_followup("An error occurred while searching the leaderboard.")
 
-    async def _search_clans(self, ctx, query: str, max_results: int, min_similarity: float) -> None:
-        clans = self.cached_leaderboard[0]["TopClans"]
-        hits = []
-        
-        for i, clan in enumerate(clans):
-            clan_similarity = fuzz.token_set_ratio(query.lower(), clan["Clan"].lower()) / 100
-            tag_similarity = fuzz.token_set_ratio(query.lower(), clan["Tag"].lower()) / 100
-            max_similarity = max(clan_similarity, tag_similarity)
-            
-            if max_similarity >= min_similarity:
-                xp_per_player = int(clan["XP"]) / int(clan["MaxPlayers"])
-                hits.append({
-                    "similarity": max_similarity,
-                    "rank": i + 1,
-                    "clan": clan["Clan"],
-                    "tag": clan["Tag"],
-                    "xp": self.format_number(int(clan["XP"])),
-                    "players": clan["MaxPlayers"],
-                    "xp_per_player": self.format_number(xp_per_player)
-                })
-        
-        hits.sort(key=lambda x: x["similarity"], reverse=True)
-        hits = hits[:max_results]
-        
+    async def _search_clans(self, ctx, leaderboard: LeaderboardModel, query: str, max_results: int, min_similarity: float) -> None:
+        hits = leaderboard.search_index(CLANS_CATEGORY).search(query, max_results, min_similarity)
+
         if not hits:
             await ctx.send_followup(f"No clans found matching '{query}' with similarity >= {min_similarity:.2f}")
             return
 
         header = ["Rank", "Clan", "Tag", "Total XP", "Players", "XP/player", "Match"]
         data = [[
-            str(hit["rank"]),
-            hit["clan"],
-            hit["tag"],
-            hit["xp"],
-            str(hit["players"]),
-            hit["xp_per_player"],
-            f"{hit['similarity']:.2f}"
-        ] for hit in hits]
+            str(clan.rank),
+            clan.clan,
+            clan.tag,
+            self.format_number(clan.xp),
+            str(clan.max_players),
+            self.format_number(clan.xp_per_player),
+            f"{similarity:.2f}"
+        ] for similarity, clan in hits]
 
         table = t2a(header=header, body=data, style=PresetStyle.thin_compact)
         await ctx.send_followup(f"```\nSearch results for '{query}' in clans:\n{table}```")
 
-    async def _search_players(self, ctx, category: str, query: str, max_results: int, min_similarity: float) -> None:
-        players = next(item[category] for item in self.cached_leaderboard if category in item)
-        hits = []
-        
-        for i, player in enumerate(players):
-            similarity = fuzz.token_set_ratio(query.lower(), player["Name"].lower()) / 100
-            if similarity >= min_similarity:
-                hits.append({
-                    "similarity": similarity,
-                    "rank": i + 1,
-                    "name": player["Name"],
-                    "value": self.format_number(float(player["Value"]))
-                })
-        
-        hits.sort(key=lambda x: x["similarity"], reverse=True)
-        hits = hits[:max_results]
-        
+    async def _search_players(self, ctx, leaderboard: LeaderboardModel, category: str, query: str, max_results: int, min_similarity: float) -> None:
+        hits = leaderboard.search_index(category).search(query, max_results, min_similarity)
+
         if not hits:
             await ctx.send_followup(f"No players found matching '{query}' with similarity >= {min_similarity:.2f}") 
             return
 
         header = ["Rank", "Name", "Value", "Match"]
         data = [[
-            str(hit["rank"]), 
-            hit["name"], 
-            hit["value"],
-            f"{hit['similarity']:.2f}"
-        ] for hit in hits]
+            str(player.rank), 
+            player.name, 
+            self.format_number(player.value),
+            f"{similarity:.2f}"
+        ] for similarity, player in hits]
         
         table = t2a(header=header, body=data, style=PresetStyle.thin_compact)
         await ctx.send_followup(f"```\nSearch results for '{query}' in {category}:\n{table}```")
 
+    async def _search_all(self, ctx, leaderboard: LeaderboardModel, query: str, max_results: int, min_similarity: float) -> None:
+        hits = []
+        for category in leaderboard.categories:
+            for similarity, entry in leaderboard.search_index(category).search(query, max_results, min_similarity):
+                if isinstance(entry, ClanEntry):
+                    name = f"{entry.clan} [{entry.tag}]"
+                else:
+                    name = entry.name
+                hits.append((similarity, category, entry.rank, name, self.format_number(entry.value)))
+
+        hits.sort(key=lambda x: x[0], reverse=True)
+        hits = hits[:max_results]
+
+        if not hits:
+            await ctx.send_followup(f"No entries found matching '{query}' with similarity >= {min_similarity:.2f}")
+            return
+
+        header = ["Category", "Rank", "Name", "Value", "Match"]
+        data = [[
+            category,
+            str(rank),
+            name,
+            value,
+            f"{similarity:.2f}"
+        ] for similarity, category, rank, name, value in hits]
+
+        table = t2a(header=header, body=data, style=PresetStyle.thin_compact)
+        await ctx.send_followup(f"```\nSearch results for '{query}' in all categories:\n{table}```")
+
 def setup(bot : CustomBot) -> None:
     bot.add_cog(Leaderboard(bot))
\ No newline at end of file
@@ -1,5 +1,4 @@
 import asyncio
-import aiohttp
 from discord.ext import commands
 from discord.commands import option
 import discord
@@ -11,11 +10,11 @@ from firestore_helper import get_firestore_client
 import constants
 import re
 from bot import CustomBot
+from http_client import BREAKER_RESET_SECONDS, CircuitOpen, HttpClient
 
 DEBUG_WEBHOOK_URL = os.getenv("DEBUG_WEBHOOK_URL")
 SERVER_LIST_URL = "https://publicapi.battlebit.cloud/Servers/GetServerList"
 MAP_ICONS_URL = "https://cdn.gametools.network/maps/battlebit/"
-SERVER_FETCH_RETRY_INTERVAL = 5
 SERVER_FETCH_RETRY_COUNT = 3
 
 log = logging.getLogger("Notifier")
@@ -24,7 +23,7 @@ class Notifier(commands.Cog):
     def __init__(self, bot: CustomBot):
         self.bot = bot
         self.server_list: List[dict] = []  # List of server data
-        self.session: aiohttp.ClientSession = bot.web_session
+        self.web_client: HttpClient = bot.web_client
         self.sent_notifications: Dict[int, set[int]] = {}  # user_id -> set of server ids
         self.user_filters: Dict[str, List[Filter]] = {}  # user_id -> list of Filters
         self.db = get_firestore_client()
@@ -88,30 +87,46 @@ class Notifier(commands.Cog):
     async def download_map_icon(self, map: str):
         """Download a single map icon."""
         url = f"{MAP_ICONS_URL}{map}.jpg"
-        async with self.session.get(url) as response:
-            if response.status == 200:
-                with open(f"map_icons/{map}.jpg", "wb") as f:
-                    f.write(await response.read())
-                log.info(f"Downloaded icon for {map}")
-            else:
-                log.warning(f"Failed to download icon for {map} (status: {response.status})")
+        try:
+            response = await self.web_client.get(url, endpoint="map-icons")
+        except Exception as e:
+            log.warning(f"Failed to download icon for {map}: {e}")
+            return
+        if response.status == 200:
+            with open(f"map_icons/{map}.jpg", "wb") as f:
+                f.write(response.body)
+            log.info(f"Downloaded icon for {map}")
+        else:
+            log.warning(f"Failed to download icon for {map} (status: {response.status})")
 
     async def fetch_server_list(self):
-        """Fetch the server list from the API."""
-        for attempt in range(SERVER_FETCH_RETRY_COUNT):
-            try:
-                async with self.session.get(SERVER_LIST_URL) as response:
-                    self.server_list = await response.json(content_type=None, encoding="utf-8-sig")
-                    log.info(f"Fetched {len(self.server_list)} servers (status: {response.status})")
-                    return
-            except Exception as e:
-                log.warning(f"Failed to fetch servers (attempt {attempt + 1}): {e}")
-                await asyncio.sleep(SERVER_FETCH_RETRY_INTERVAL)
-        
+        """Fetch the server list from the API.
+
+        The debug webhook is only told when failures open the endpoint's
+        circuit, not on every fetch while it stays open.
+        """
+        circuit = self.web_client.circuit("server-list")
+        opened = circuit.opened
+        try:
+            # Retried with backoff by the client
+            response = await self.web_client.get(SERVER_LIST_URL, endpoint="server-list", retries=SERVER_FETCH_RETRY_COUNT - 1)
+            self.server_list = response.json(encoding="utf-8-sig")
+            log.info(f"Fetched {len(self.server_list)} servers (status: {response.status})")
+            return
+        except CircuitOpen as e:
+            log.debug(f"Skipping server list fetch: {e}")
+            return
+        except Exception as e:
+            log.warning(f"Failed to fetch servers: {e}")
+
         log.error("Max retries reached. Could not fetch server list.")
-        if DEBUG_WEBHOOK_URL:
-            async with self.session.post(DEBUG_WEBHOOK_URL, json={"content": f"Failed to fetch server list after {SERVER_FETCH_RETRY_COUNT} retries."}) as response:
+        if DEBUG_WEBHOOK_URL and circuit.opened > opened:
+            try:
+                content = f"Failed to fetch server list repeatedly, pausing requests for {BREAKER_RESET_SECONDS}s."
+                response = await self.web_client.post(DEBUG_WEBHOOK_URL, endpoint="debug-webhook", json={"content": content})
                 log.info(f"Sent message to debug webhook, status: {response.status}")
+            except Exception as e:
+                log.warning(f"Failed to send message to debug webhook: {e}")
 
     async def fetch_and_notify(self):
         """Fetch server list periodically and notify users of matches."""
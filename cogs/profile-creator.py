@@ -5,71 +5,34 @@ from bot import CustomBot
 import logging
 from firestore_helper import get_firestore_client, get_storage_bucket
 import firebase_admin
-from typing import Dict, Any, Tuple, Optional, Literal, List
+from typing import Dict, Any, Tuple, Optional, List
 import json
 import os
 from google.cloud import storage
 from google.cloud.firestore_v1.base_query import FieldFilter
-from google.cloud.firestore_v1 import DocumentSnapshot
+from google.cloud.firestore_v1 import ArrayUnion, DocumentReference, DocumentSnapshot
+from google.cloud.firestore_v1.field_path import FieldPath
+from profile_cache import ProfileCache
+from search_index import SearchIndex
+from stat_rankings import StatRankings
+from table2ascii import table2ascii as t2a, PresetStyle
+from banner_processing import BannerProcessor, InvalidBanner
+from soundtrack_transcoder import SoundtrackTranscoder, TranscodeJob
+from profile_schema import PROFILE_SCHEMA, validate_profile
+from profile_transfer import ExportWriter, ImportFileError, iter_import_batches, iter_import_rows
 import re
 from discord.ext.commands import has_role
-import tempfile
 from datetime import timezone 
 from datetime import datetime
 import asyncio
 import aiohttp
+import functools
+import random
+import tempfile
+import time
 
 log = logging.getLogger("ProfileCreator")
 
-PROFILE_SCHEMA = {
-    "bio": str,
-    "accent_color": str,
-    "twitter_profile_url" : str,
-    "youtube_profile_url" : str,
-    "twitch_profile_url" : str,
-    "join_date": int,  # Unix timestamp
-    "membership_type": str,
-    "stats": {
-        "m200_kills": int,
-        "l96_kills": int,
-        "rem700_kills": int,
-        "sv98_kills": int,
-        "msr_kills": int,
-        "ssg69_kills": int,
-        "total_kills": int,
-        "kdr": float | int,
-        "kpm": float | int,
-        "time_played": int | float,
-        "score": int,
-        "prestige": int,
-        "level": int,
-    }
-}
-PROFILE_SCHEMA_STR = {
-    "bio": "str",
-    "accent_color": "str",
-    "twitter_profile_url" : "str",
-    "youtube_profile_url" : "str",
-    "twitch_profile_url" : "str",
-    "join_date": "int",  # Unix timestamp
-    "membership_type": "str (Member or Founder)",
-    "stats": {
-        "m200_kills": "int",
-        "l96_kills": "int",
-        "rem700_kills": "int",
-        "sv98_kills": "int",
-        "msr_kills": "int",
-        "ssg69_kills": "int",
-        "total_kills": "int",
-        "kdr": "float | int",
-        "kpm": "float | int",
-        "time_played": "int | float",
-        "score": "int",
-        "prestige": "int",
-        "level": "int",
-    }
-}
-
 PROFILE_EXAMPLE = {
     "bio": "Super awesome bio",
     "accent_color": "#FF0000",
@@ -97,28 +60,45 @@ PROFILE_EXAMPLE = {
 
 ALLOWED_IMAGE_TYPES = ['.png', '.jpg', '.jpeg', '.gif']
 ALLOWED_AUDIO_TYPES = ['.mp3', '.wav']
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # Resumable upload chunk, must be a multiple of 256 KiB
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+MAX_IMPORT_BYTES = 100 * 1024 * 1024
+IMPORT_PROGRESS_INTERVAL = 5  # Seconds between edits of the import progress message
+MAX_REPORTED_IMPORT_ERRORS = 10
+EXPORT_PAGE_SIZE = 500
+PROFILE_SEARCH_NGRAM_SIZE = 3  # Bigrams are shared by too many of tens of thousands of names
+PROFILE_SEARCH_MAX_CANDIDATES = 1000  # Names scored per query, those sharing the most trigrams
+PROFILE_SEARCH_MIN_SIMILARITY = 0.6
+MAX_LISTED_ALIASES = 3
+MAX_LISTED_NAME_LENGTH = 64  # Names and queries are cut to this in /find-profile, so results fit one message
+MESSAGE_LIMIT = 2000
+RANKED_STATS = list(PROFILE_SCHEMA["stats"])
+CLAN_STATS_MAX_ROWS = 25
+CLAN_STATS_TOP_SHARE = 0.1  # The table footer shows what it takes to be in this share of members
 
 # Constants
 TIMEOUT_SECONDS = 300
 COLLECTION_NAME = "profiles"
-MAX_BIO_LENGTH = 600
 STEAM_ID_PATTERN = r'^\d{17}$'  # Steam ID format validation
-COLOR_PATTERN = r'^#[0-9A-Fa-f]{6}$'  # Hex color validation
-MEMBERSHIP_TYPES = Literal["Member", "Founder"]
-ALLOWED_MEMBERSHIP_TYPES = ["Member", "Founder"]
-
-# Field constraints
-STAT_CONSTRAINTS = {
-    "kdr": (0, 100),  # min, max
-    "kpm": (0, 100),
-    "time_played": (0, 1000000),
-    "level": (0, 200),
-    "prestige": (0, 10),
-}
 
 STEAM_API_KEY = os.getenv("STEAM_API_KEY")
 STEAM_API_URL = "https://api.steampowered.com/ISteamUser/GetPlayerSummaries/v0002/"
 BATCH_SIZE = 100  # Steam API spec only allows up to 100 Steam IDs per request
+STEAM_MAX_CONCURRENT_REQUESTS = 4
+STEAM_REQUEST_INTERVAL = 0.25  # Minimum seconds between the starts of two Steam API requests
+STEAM_REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=15)
+FIRESTORE_BATCH_LIMIT = 500  # Maximum number of writes in one Firestore WriteBatch
+STEAM_API_BUDGET_PER_HOUR = int(os.getenv("STEAM_API_BUDGET_PER_HOUR", "60"))  # Each call checks up to BATCH_SIZE profiles
+STEAM_MAX_BURST_CALLS = 5  # Unused budget carried over between ticks, at most
+STEAM_REFRESH_TICK_SECONDS = 60
+STEAM_MIN_CHECK_INTERVAL = 30 * 60  # Profiles whose name just changed
+STEAM_DEFAULT_CHECK_INTERVAL = 60 * 60
+STEAM_MAX_CHECK_INTERVAL = 24 * 60 * 60  # Dormant profiles, reached by doubling the interval on every unchanged check
+
+class UploadTooLarge(Exception):
+    """Raised when an attachment is larger than MAX_UPLOAD_BYTES."""
+
 
 class ProfileCreator(commands.Cog):
     """Cog for managing user profiles including creation, updates, and file uploads."""
@@ -127,15 +107,34 @@ class ProfileCreator(commands.Cog):
         self.bot = bot
         self.db = get_firestore_client()
         self.bucket = get_storage_bucket()
+        self.profile_cache = ProfileCache(self.db, COLLECTION_NAME)
+        self.profile_index: Optional[SearchIndex] = None  # Built on startup, then updated as names change
+        self.stat_rankings: Optional[StatRankings] = None  # Built with the profile index
+        self.clan_stats_tables: Dict[Tuple[str, int], Tuple[int, str]] = {}  # (stat, rows) -> (stat version, table)
+        self.banner_processor = BannerProcessor()
+        self.soundtrack_transcoder = SoundtrackTranscoder()
+        self.soundtrack_transcoder.start()
         self.command_messages = {}  # Track messages by user ID
+        self.steam_semaphore = asyncio.Semaphore(STEAM_MAX_CONCURRENT_REQUESTS)
+        self.steam_rate_lock = asyncio.Lock()
+        self.steam_next_request = 0.0  # time.monotonic() before which no new Steam request starts
+        self.steam_api_calls = 0
+        self.steam_call_allowance = 0.0  # Steam API calls the scheduler may still make, refilled every tick
 
     @commands.Cog.listener()
     async def on_ready(self) -> None:
         log.info("ProfileCreator cog is ready")
+        await self.schedule_unscheduled_profiles()
+        if self.profile_index is None:
+            await self.build_profile_index()
+        self.profile_cache.start_listener()
         self.steam_profile_monitor.start()
 
     def cog_unload(self):
         self.steam_profile_monitor.cancel()  # Cleanup task on unload
+        self.profile_cache.stop_listener()
+        self.banner_processor.shutdown()
+        self.soundtrack_transcoder.stop()
 
     async def _track_message(self, ctx: discord.ApplicationContext, message: discord.Message) -> None:
         """Tracks a message related to a command interaction."""
@@ -154,76 +153,14 @@ class ProfileCreator(commands.Cog):
             del self.command_messages[ctx.author.id]
 
     def _validate_profile_data(self, data: Dict[str, Any]) -> Tuple[bool, list[str]]:
-        """Validates profile data against schema and constraints."""
-        errors = []
-        try:
-            if not isinstance(data, dict):
-                return False, ["Invalid data format"]
-
-            # Validate join_date
-            if "join_date" in data:
-                if not isinstance(data["join_date"], int):
-                    errors.append("join_date must be an integer (Unix timestamp)")
-                elif data["join_date"] < 0:
-                    errors.append("join_date cannot be negative")
-                elif data["join_date"] > int(datetime.now(timezone.utc).timestamp()):
-                    errors.append("join_date cannot be in the future")
-
-            # Validate bio
-            if "bio" in data:
-                if not isinstance(data["bio"], str):
-                    errors.append("bio must be a string")
-                elif len(data["bio"]) > MAX_BIO_LENGTH:
-                    errors.append(f"bio must be less than {MAX_BIO_LENGTH} characters")
-
-            # Validate accent_color
-            if "accent_color" in data:
-                if not isinstance(data["accent_color"], str):
-                    errors.append("accent_color must be a string")
-                elif not re.match(COLOR_PATTERN, data["accent_color"]):
-                    errors.append("accent_color must be a valid hex color (e.g., #FF0000)")
-
-            # Validate membership_type
-            if "membership_type" in data:
-                if not isinstance(data["membership_type"], str):
-                    errors.append("membership_type must be a string")
-                elif data["membership_type"] not in ALLOWED_MEMBERSHIP_TYPES:
-                    errors.append(f"membership_type must be one of: {', '.join(ALLOWED_MEMBERSHIP_TYPES)}")
-
-            # Validate stats
-            if "stats" in data:
-                if not isinstance(data["stats"], dict):
-                    errors.append("stats must be a dictionary")
-                else:
-                    for field, value in data["stats"].items():
-                        if field not in PROFILE_SCHEMA["stats"]:
-                            errors.append(f"Unknown stat field: {field}")
-                            continue
-
-                        # Type validation
-                        if not isinstance(value, PROFILE_SCHEMA["stats"][field]):
-                            errors.append(f"{field} must be of type {PROFILE_SCHEMA_STR['stats'][field]}")
-
-                        # Range validation (inclusive)
-                        if field in STAT_CONSTRAINTS:
-                            min_val, max_val = STAT_CONSTRAINTS[field]
-                            if value < min_val or value > max_val:
-                                errors.append(f"{field} must be between {min_val} and {max_val} (inclusive)")
-
-
-            return not errors, errors
-
-        except Exception as e:
-            log.error(f"Validation error: {e}")
-            return False, [str(e)]
+        """Validates profile data against the compiled profile schema, reporting every error."""
+        errors = validate_profile(data)
+        return not errors, errors
 
-    async def get_user_profile(self, discord_id: int) -> Optional[DocumentSnapshot]:
-        """Gets a user's profile from Firestore."""
+    async def get_user_profile(self, discord_id: int) -> Optional[Dict[str, Any]]:
+        """Gets a user's profile, from the profile cache when possible."""
         try:
-            profile_ref = self.db.collection(COLLECTION_NAME).where(
-                filter=FieldFilter("discord_id", "==", discord_id)
-            ).get()
-            return profile_ref[0] if profile_ref else None
+            return self.profile_cache.get_by_discord_id(discord_id)
         except Exception as e:
             log.error(f"Error getting user profile: {e}")
             return None
@@ -327,11 +264,13 @@ class ProfileCreator(commands.Cog):
                 "banner_url": "",
                 "soundtrack_url": "",
                 "last_updated": int(datetime.now(timezone.utc).timestamp()),
+                "next_check": 0,  # Due for a Steam refresh right away
                 "membership_type": profile_data.get("membership_type", "Member"),  # Default to Member
             })
 
             # Save to Firestore
-            self.db.collection(COLLECTION_NAME).document(steam_id).set(profile_data)
+            self.profile_cache.set(steam_id, profile_data)
+            self._reindex_profile(steam_id, profile_data)
 
             # Clean up messages and send final confirmation
             await self._cleanup_command_messages(ctx)
@@ -352,8 +291,8 @@ class ProfileCreator(commands.Cog):
         """Updates an existing profile for a user."""
         await ctx.defer()
 
-        profile_ref = await self.get_user_profile(ctx.author.id)
-        if not profile_ref:
+        profile = await self.get_user_profile(ctx.author.id)
+        if not profile:
             await ctx.followup.send("❌ Profile not found.")
             return
 
@@ -389,7 +328,7 @@ class ProfileCreator(commands.Cog):
 
             # After validation but before updating
             if "membership_type" in update_data:
-                current_type = profile_ref.get("membership_type")
+                current_type = profile.get("membership_type")
                 if current_type is None:
                     current_type = "Member"
                 
@@ -398,15 +337,11 @@ class ProfileCreator(commands.Cog):
                     if not is_approved:
                         update_data["membership_type"] = current_type
 
-            # Update profile
+            # Update profile, along with the discord username in case it changed
             update_data['last_updated'] = int(datetime.now(timezone.utc).timestamp())
-            profile_ref.reference.update(update_data)
-
-            # Update discord username in case it changed
-            if "discord_username" in update_data:
-                profile_ref.reference.update({"discord_username": update_data["discord_username"]})
-            else:
-                profile_ref.reference.update({"discord_username": ctx.author.name})
+            update_data["discord_username"] = ctx.author.name
+            self.profile_cache.update(profile["steam_id"], update_data)
+            self._reindex_profile(profile["steam_id"], {**profile, **update_data})
 
             # Clean up messages and send final confirmation
             await self._cleanup_command_messages(ctx)
@@ -438,8 +373,8 @@ class ProfileCreator(commands.Cog):
 
     async def _handle_file_upload(self, ctx: discord.ApplicationContext, file_type: str, allowed_types: list) -> None:
         """Handles file uploads for profile updates."""
-        profile_ref = await self.get_user_profile(ctx.author.id)
-        if not profile_ref:
+        profile = await self.get_user_profile(ctx.author.id)
+        if not profile:
             await ctx.followup.send("❌ Profile not found.")
             return
 
@@ -466,28 +401,22 @@ class ProfileCreator(commands.Cog):
                 await ctx.followup.send(f"❌ Invalid file type. Allowed types: {', '.join(allowed_types)}")
                 return
 
-            # Create a temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
-                # Download the file
-                await file.save(temp_file.name)
-                
-                # Upload to Storage bucket with consistent naming
-                steam_id = profile_ref.get('steam_id')
-                blob_path = f"{steam_id}/{file_type}{ext}"
-                blob = self.bucket.blob(blob_path)
-                
-                # Upload the file directly, overwriting if it exists
-                blob.upload_from_filename(temp_file.name)
-                blob.content_type = file.content_type  # Preserve the content type
-                blob.make_public()
+            if file.size > MAX_UPLOAD_BYTES:
+                await self._cleanup_command_messages(ctx)
+                await ctx.followup.send(f"❌ File is too large. Maximum size is {MAX_UPLOAD_BYTES // 1024 // 1024} MB.")
+                return
+
+            steam_id = profile['steam_id']
+            if file_type == "soundtrack":
+                await self._queue_soundtrack(ctx, file, steam_id)
+                return
 
-            # Clean up temporary file
-            os.unlink(temp_file.name)
+            # Upload to Storage bucket with consistent naming, overwriting if it exists
+            fields = await self._upload_banner(file, steam_id, ext)
 
             # Update profile with new URL
-            url = blob.public_url
-            profile_ref.reference.update({
-                f"{file_type}_url": url,
+            self.profile_cache.update(steam_id, {
+                **fields,
                 "last_updated": int(datetime.now(timezone.utc).timestamp())
             })
 
@@ -498,14 +427,260 @@ class ProfileCreator(commands.Cog):
         except TimeoutError:
             await self._cleanup_command_messages(ctx)
             await ctx.followup.send("❌ Upload timed out.")
+        except UploadTooLarge:
+            await self._cleanup_command_messages(ctx)
+            await ctx.followup.send(f"❌ File is too large. Maximum size is {MAX_UPLOAD_BYTES // 1024 // 1024} MB.")
+        except InvalidBanner as e:
+            await self._cleanup_command_messages(ctx)
+            await ctx.followup.send(f"❌ Invalid banner: {e}.")
         except Exception as e:
             await self._cleanup_command_messages(ctx)
             log.error(f"Error handling file upload: {e}")
             await ctx.followup.send("❌ An error occurred while processing your file.")
 
+    @commands.guild_only()
+    @has_role("Admin")
+    @commands.slash_command(name="admin-profile-cache-stats", description="Show profile cache hit rates")
+    async def admin_profile_cache_stats(self, ctx: discord.ApplicationContext) -> None:
+        """Shows profile cache statistics (Admin only)."""
+        stats = self.profile_cache.stats()
+        await ctx.send_response("\n".join(f"**{name}**: {value}" for name, value in stats.items()), ephemeral=True)
+
+    @commands.guild_only()
+    @has_role("Member")
+    @commands.slash_command(name="find-profile", description="Find profiles by Steam name, previous Steam names or Discord name")
+    @option("query", "Name to search for", required=True, type=str)
+    @option("max_results", "Number of profiles to show", required=False, type=int, min_value=1, max_value=25)
+    async def find_profile(self, ctx: discord.ApplicationContext, query: str, max_results: int = 10) -> None:
+        """Searches profiles by their current and previous names."""
+        if self.profile_index is None:
+            await ctx.send_response("❌ Profile search is still loading. Please try again in a few seconds.", ephemeral=True)
+            return
+
+        hits = self.profile_index.search(query, max_results, PROFILE_SEARCH_MIN_SIMILARITY)
+        shown_query = self._listed_name(query)
+        if not hits:
+            await ctx.send_response(f"❌ No profiles found matching '{shown_query}'.", ephemeral=True)
+            return
+
+        message = f"Profiles matching '{shown_query}':"
+        for shown, (similarity, match) in enumerate(hits):
+            line = f"**{self._listed_name(match['steam_username'] or 'Unknown')}** (`{match['steam_id']}`)"
+            if match["discord_username"]:
+                line += f" · Discord: {self._listed_name(match['discord_username'])}"
+            if match["aliases"]:
+                line += f" · previously {', '.join(self._listed_name(alias) for alias in match['aliases'])}"
+            line += f" · {similarity:.2f}"
+            more = f"\n…and {len(hits) - shown} more" if shown < len(hits) - 1 else ""  # Room kept for the note
+            if len(message) + 1 + len(line) + len(more) > MESSAGE_LIMIT:
+                message += f"\n…and {len(hits) - shown} more"
+                break
+            message += "\n" + line
+        await ctx.send_response(message)
+
+    def _listed_name(self, name: str) -> str:
+        """Returns a name cut to MAX_LISTED_NAME_LENGTH and escaped for display."""
+        if len(name) > MAX_LISTED_NAME_LENGTH:
+            name = name[:MAX_LISTED_NAME_LENGTH - 1] + "…"
+        return discord.utils.escape_markdown(name)
+
+    async def build_profile_index(self) -> None:
+        """Builds the profile search index and the stat rankings with one read of the collection."""
+        try:
+            start = time.perf_counter()
+            self.profile_index, self.stat_rankings = await asyncio.to_thread(self._load_profile_index)
+            log.info(f"Indexed {len(self.profile_index)} profiles for search and {len(self.stat_rankings)} for "
+                     f"stat rankings in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            log.error(f"Error building profile search index: {e}")
+
+    def _load_profile_index(self) -> Tuple[SearchIndex, StatRankings]:
+        """Reads the name and stats fields of every profile into a new SearchIndex and StatRankings. Blocking."""
+        index = SearchIndex(PROFILE_SEARCH_NGRAM_SIZE, PROFILE_SEARCH_MAX_CANDIDATES)
+        ranked = []
+        query = self.db.collection(COLLECTION_NAME).select(["steam_username", "discord_username", "aliases", "stats"])
+        for snapshot in query.stream():
+            profile = snapshot.to_dict() or {}
+            self._index_profile(index, snapshot.id, profile)
+            ranked.append((snapshot.id, profile.get("stats"), self._display_name(snapshot.id, profile)))
+        return index, StatRankings.build(RANKED_STATS, ranked)
+
+    def _display_name(self, steam_id: str, profile: Dict[str, Any]) -> str:
+        return profile.get("steam_username") or profile.get("discord_username") or steam_id
+
+    def _index_profile(self, index: SearchIndex, steam_id: str, profile: Dict[str, Any]) -> None:
+        """Adds or replaces a profile in index under its Steam, Discord and previous Steam names."""
+        steam_username = profile.get("steam_username") or ""
+        discord_username = profile.get("discord_username") or ""
+        # aliases are appended as names change, so the newest is last
+        aliases = [alias.get("steam_username") for alias in reversed(profile.get("aliases") or []) if isinstance(alias, dict)]
+        aliases = [alias for alias in dict.fromkeys(aliases) if alias and alias != steam_username]
+        index.add(steam_id, [steam_username, discord_username, *aliases], {
+            "steam_id": steam_id,
+            "steam_username": steam_username,
+            "discord_username": discord_username,
+            "aliases": aliases[:MAX_LISTED_ALIASES],
+        })
+
+    def _reindex_profile(self, steam_id: str, profile: Dict[str, Any]) -> None:
+        """Applies a created or changed profile to the search index and the stat rankings."""
+        if self.profile_index is not None:
+            self._index_profile(self.profile_index, steam_id, profile)
+        if self.stat_rankings is not None:
+            self.stat_rankings.update(steam_id, profile.get("stats"), self._display_name(steam_id, profile))
+
+    @commands.guild_only()
+    @has_role("Member")
+    @commands.slash_command(name="clan-stats", description="Rank clan members by a profile stat")
+    @option("stat", "Stat to rank by", required=True, type=str, choices=RANKED_STATS)
+    @option("rows", "Number of members to show", required=False, type=int, min_value=1, max_value=CLAN_STATS_MAX_ROWS)
+    async def clan_stats(self, ctx: discord.ApplicationContext, stat: str, rows: int = 10) -> None:
+        """Shows the best members by a stat, along with the caller's own rank."""
+        if self.stat_rankings is None:
+            await ctx.send_response("❌ Clan stats are still loading. Please try again in a few seconds.", ephemeral=True)
+            return
+
+        message = f"```\n{self._clan_stats_table(stat, rows)}```"
+        profile = await self.get_user_profile(ctx.author.id)
+        rank = self.stat_rankings.rank(stat, profile["steam_id"]) if profile else None
+        if rank is not None:
+            share = self.stat_rankings.percentile(stat, profile["steam_id"])
+            message += f"\nYour rank: #{rank} of {self.stat_rankings.count(stat)}, at or above {share:.0%} of ranked members"
+        await ctx.send_response(message)
+
+    def _clan_stats_table(self, stat: str, rows: int) -> str:
+        """Returns the rendered ranking of a stat, cached until the ranking changes."""
+        version = self.stat_rankings.versions[stat]
+        cached = self.clan_stats_tables.get((stat, rows))
+        if cached and cached[0] == version:
+            return cached[1]
+
+        top = self.stat_rankings.top(stat, rows)
+        if top:
+            body = [[str(rank), self.stat_rankings.name(steam_id), self._format_stat(value)] for rank, steam_id, value in top]
+            threshold = self.stat_rankings.value_at_percentile(stat, CLAN_STATS_TOP_SHARE)
+            table = (
+                t2a(header=["Rank", "Member", stat], body=body, style=PresetStyle.thin_compact)
+                + f"\n{self.stat_rankings.count(stat)} ranked members, top {CLAN_STATS_TOP_SHARE:.0%} from "
+                + self._format_stat(threshold)
+            )
+        else:
+            table = f"No members have {stat} in their profile yet."
+        self.clan_stats_tables[(stat, rows)] = (version, table)
+        return table
+
+    def _format_stat(self, value: float) -> str:
+        return f"{int(value):,}" if value.is_integer() else f"{value:,.2f}"
+
+    async def _queue_soundtrack(self, ctx: discord.ApplicationContext, file: discord.Attachment, steam_id: str) -> None:
+        """Queues a soundtrack for transcoding; the result is reported in the channel when it's published."""
+        job = TranscodeJob(
+            steam_id,
+            functools.partial(self._download_attachment, file),
+            functools.partial(self._publish_soundtrack, ctx.channel, ctx.author, steam_id),
+        )
+        await self._cleanup_command_messages(ctx)
+        if not self.soundtrack_transcoder.submit(job):
+            await ctx.followup.send("❌ Too many soundtracks are being processed. Please try again later.")
+            return
+        await ctx.followup.send("⏳ Soundtrack received. It will be published once it has been processed.")
+
+    async def _publish_soundtrack(self, channel: discord.abc.Messageable, user: discord.abc.User,
+                                  steam_id: str, result: Any) -> None:
+        """Uploads a transcoded soundtrack and points the profile to it."""
+        if isinstance(result, Exception):
+            await channel.send(f"❌ {user.mention} Your soundtrack for Steam ID {steam_id} could not be processed: {result}")
+            return
+
+        try:
+            url = await asyncio.to_thread(self._upload_bytes, f"{steam_id}/soundtrack.mp3", "audio/mpeg", result)
+            self.profile_cache.update(steam_id, {
+                "soundtrack_url": url,
+                "last_updated": int(datetime.now(timezone.utc).timestamp())
+            })
+        except Exception as e:
+            log.error(f"Error publishing soundtrack for {steam_id}: {e}")
+            await channel.send(f"❌ {user.mention} Your soundtrack for Steam ID {steam_id} could not be published. Please try again later.")
+            return
+        await channel.send(f"✅ {user.mention} Soundtrack updated successfully for Steam ID: {steam_id}!")
+
+    async def _upload_banner(self, file: discord.Attachment, steam_id: str, ext: str) -> Dict[str, Any]:
+        """Uploads a banner along with resized WebP and JPEG variants.
+
+        The original is streamed from the CDN into a resumable upload in
+        UPLOAD_CHUNK_SIZE chunks and spooled to a temporary file on the way,
+        from which the banner process pool makes the variants. The main
+        process never holds the whole image. The upload is only finalized
+        once the variants are made, so an invalid image cancels it and the
+        existing banner is left untouched. Variant URLs are stored as
+        banner_variants: {format: {width: url}}.
+        """
+        blob = self.bucket.blob(f"{steam_id}/banner{ext}")
+        writer = blob.open("wb", content_type=file.content_type, chunk_size=UPLOAD_CHUNK_SIZE)
+        try:
+            with tempfile.NamedTemporaryFile(suffix=ext) as spool:
+                size = 0
+                async with self.bot.web_client.stream("GET", file.url, endpoint="discord-cdn") as response:
+                    response.raise_for_status()
+                    async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > MAX_UPLOAD_BYTES:
+                            raise UploadTooLarge(f"{file.filename} is larger than {MAX_UPLOAD_BYTES // 1024 // 1024} MB")
+                        spool.write(chunk)
+                        await asyncio.to_thread(writer.write, chunk)
+                spool.flush()
+                variants = await self.banner_processor.process(spool.name)
+            await asyncio.to_thread(writer.close)
+        except BaseException:
+            await asyncio.shield(asyncio.to_thread(writer.terminate))
+            raise
+
+        uploads = [
+            (f"{steam_id}/banner_{variant.width}.{variant.format}", variant.content_type, variant.data)
+            for variant in variants
+        ]
+        _, *urls = await asyncio.gather(
+            asyncio.to_thread(blob.make_public),
+            *(asyncio.to_thread(self._upload_bytes, *upload) for upload in uploads)
+        )
+
+        banner_variants: Dict[str, Dict[str, str]] = {}
+        for variant, url in zip(variants, urls):
+            banner_variants.setdefault(variant.format, {})[str(variant.width)] = url
+        return {"banner_url": blob.public_url, "banner_variants": banner_variants}
+
+    def _upload_bytes(self, blob_path: str, content_type: str, data: bytes) -> str:
+        """Uploads data to blob_path and returns its public URL. Blocking."""
+        blob = self.bucket.blob(blob_path)
+        blob.upload_from_string(data, content_type=content_type)
+        blob.make_public()
+        return blob.public_url
+
+    async def _download_attachment(self, file: discord.Attachment) -> bytearray:
+        """Reads an attachment into memory, enforcing MAX_UPLOAD_BYTES while reading. Returned without a copy."""
+        data = bytearray()
+        async with self.bot.web_client.stream("GET", file.url, endpoint="discord-cdn") as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                data += chunk
+                if len(data) > MAX_UPLOAD_BYTES:
+                    raise UploadTooLarge(f"{file.filename} is larger than {MAX_UPLOAD_BYTES // 1024 // 1024} MB")
+        return data
+
+    async def _download_to_file(self, file: discord.Attachment, destination: Any, limit: int) -> None:
+        """Streams an attachment into a file object, enforcing limit while reading."""
+        size = 0
+        async with self.bot.web_client.stream("GET", file.url, endpoint="discord-cdn") as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > limit:
+                    raise UploadTooLarge(f"{file.filename} is larger than {limit // 1024 // 1024} MB")
+                destination.write(chunk)
+
     def profile_exists(self, steam_id: str) -> bool:
         """Checks if a profile exists for a given Steam ID."""
-        return bool(self.db.collection(COLLECTION_NAME).where(filter=FieldFilter("steam_id", "==", steam_id)).get())
+        return self.profile_cache.exists(steam_id)
  
     @commands.guild_only()
     @has_role("Admin")
@@ -568,11 +743,13 @@ class ProfileCreator(commands.Cog):
                 "banner_url": "",
                 "soundtrack_url": "",
                 "last_updated": int(datetime.now(timezone.utc).timestamp()),
+                "next_check": 0,  # Due for a Steam refresh right away
                 "membership_type": profile_data.get("membership_type", "Member"),
             })
 
             # Save to Firestore
-            self.db.collection(COLLECTION_NAME).document(steam_id).set(profile_data)
+            self.profile_cache.set(steam_id, profile_data)
+            self._reindex_profile(steam_id, profile_data)
 
             await self._cleanup_command_messages(ctx)
             await ctx.followup.send(f"✅ Profile created successfully for user {steam_id}!")
@@ -585,6 +762,154 @@ class ProfileCreator(commands.Cog):
             log.error(f"Error creating profile: {e}")
             await ctx.followup.send("❌ An error occurred while creating the profile.")
 
+    @commands.guild_only()
+    @has_role("Admin")
+    @commands.slash_command(
+        name="admin-import-profiles",
+        description="Admin command to create profiles in bulk from a JSONL or zip file"
+    )
+    @option("file", "JSONL file (gzipped, like an export, or a zip of them) with one profile and its steam_id per line", required=True,
+            type=discord.Attachment)
+    async def admin_import_profiles(self, ctx: discord.ApplicationContext, file: discord.Attachment) -> None:
+        """Creates profiles in bulk (Admin only).
+
+        The file is downloaded to a temporary file and read back in batches
+        in a worker thread, so the rows are parsed, validated and written
+        one WriteBatch at a time. Profiles that already exist are skipped.
+        """
+        await ctx.defer()
+
+        if not file.filename.lower().endswith((".jsonl", ".jsonl.gz", ".zip")):
+            await ctx.followup.send("❌ Please upload a .jsonl, .jsonl.gz or .zip file.")
+            return
+        if file.size > MAX_IMPORT_BYTES:
+            await ctx.followup.send(f"❌ File is too large. Maximum size is {MAX_IMPORT_BYTES // 1024 // 1024} MB.")
+            return
+
+        progress = await ctx.followup.send("⏳ Importing profiles...", wait=True)
+        imported = existing = invalid = 0
+        errors: List[str] = []
+
+        def summary() -> str:
+            return f"{imported} imported, {existing} already existed, {invalid} invalid"
+
+        try:
+            with tempfile.TemporaryFile() as download:
+                await self._download_to_file(file, download, MAX_IMPORT_BYTES)
+                download.seek(0)
+                batches = iter_import_batches(iter_import_rows(download, file.filename))
+                last_progress = time.monotonic()
+                while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+                    invalid += len(batch.invalid)
+                    errors.extend(f"{location}: {', '.join(row_errors)}" for location, row_errors in batch.invalid)
+                    del errors[MAX_REPORTED_IMPORT_ERRORS:]
+                    if batch.rows:
+                        created = await asyncio.to_thread(self._write_imported_profiles, batch.rows)
+                        for steam_id, profile in created:
+                            self._reindex_profile(steam_id, profile)
+                        imported += len(created)
+                        existing += len(batch.rows) - len(created)
+                    if time.monotonic() - last_progress >= IMPORT_PROGRESS_INTERVAL:
+                        last_progress = time.monotonic()
+                        await progress.edit(content=f"⏳ Importing profiles... {summary()}")
+        except ImportFileError as e:
+            await progress.edit(content=f"❌ Could not read {file.filename}: {e}.")
+            return
+        except UploadTooLarge:
+            await progress.edit(content=f"❌ File is too large. Maximum size is {MAX_IMPORT_BYTES // 1024 // 1024} MB.")
+            return
+        except Exception as e:
+            log.error(f"Error importing profiles: {e}")
+            await progress.edit(content=f"❌ An error occurred while importing profiles. Stopped after {summary()}.")
+            return
+
+        message = f"✅ Import finished: {summary()}."
+        if errors:
+            shown = "\n".join(errors)
+            more = f"\n...and {invalid - len(errors)} more" if invalid > len(errors) else ""
+            message += f"\n```\n{shown[:1500]}{more}\n```"
+        await progress.edit(content=message)
+
+    def _write_imported_profiles(self, rows: List[Tuple[str, str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Creates the profiles of rows that don't exist yet in one WriteBatch and returns them. Blocking."""
+        collection = self.db.collection(COLLECTION_NAME)
+        references = [collection.document(steam_id) for _, steam_id, _ in rows]
+        existing = {snapshot.id for snapshot in self.db.get_all(references, field_paths=["steam_id"]) if snapshot.exists}
+
+        now = int(datetime.now(timezone.utc).timestamp())
+        batch = self.db.batch()
+        created = []
+        for reference, (_, steam_id, profile) in zip(references, rows):
+            if steam_id in existing:
+                continue
+            profile = {
+                **profile,
+                "steam_id": steam_id,
+                "discord_id": "",
+                "discord_username": "",
+                "banner_url": "",
+                "soundtrack_url": "",
+                "last_updated": now,
+                "next_check": 0,  # Due for a Steam refresh right away
+                "membership_type": profile.get("membership_type", "Member"),
+            }
+            batch.set(reference, profile)
+            created.append((steam_id, profile))
+        if created:
+            batch.commit()
+        for steam_id, _ in created:
+            self.profile_cache.invalidate(steam_id)  # Drops cached "no such profile" entries
+        return created
+
+    @commands.guild_only()
+    @has_role("Admin")
+    @commands.slash_command(
+        name="admin-export-profiles",
+        description="Admin command to export all profiles as a compressed JSONL file"
+    )
+    async def admin_export_profiles(self, ctx: discord.ApplicationContext) -> None:
+        """Exports every profile as gzip compressed JSONL (Admin only).
+
+        The collection is read page by page, ordered by Steam ID, and each
+        page is compressed into a temporary file before the next is read.
+        """
+        await ctx.defer(ephemeral=True)
+
+        try:
+            with tempfile.TemporaryFile() as export:
+                writer = ExportWriter(export)
+                last = None
+                while (last := await asyncio.to_thread(self._export_page, writer, last)) is not None:
+                    pass
+                writer.close()
+
+                size = export.tell()
+                if size > ctx.guild.filesize_limit:
+                    await ctx.followup.send(
+                        f"❌ The export is {size // 1024 // 1024} MB, more than the "
+                        f"{ctx.guild.filesize_limit // 1024 // 1024} MB this server allows for uploads.",
+                        ephemeral=True
+                    )
+                    return
+
+                export.seek(0)
+                filename = f"profiles-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.jsonl.gz"
+                await ctx.followup.send(f"✅ Exported {writer.count} profiles.", file=discord.File(export, filename),
+                                        ephemeral=True)
+        except Exception as e:
+            log.error(f"Error exporting profiles: {e}")
+            await ctx.followup.send("❌ An error occurred while exporting profiles.", ephemeral=True)
+
+    def _export_page(self, writer: ExportWriter, after: Optional[DocumentSnapshot]) -> Optional[DocumentSnapshot]:
+        """Writes the page of profiles following after and returns its last profile, or None after the last page. Blocking."""
+        query = self.db.collection(COLLECTION_NAME).order_by(FieldPath.document_id()).limit(EXPORT_PAGE_SIZE)
+        if after is not None:
+            query = query.start_after(after)
+        snapshots = query.get()
+        for snapshot in snapshots:
+            writer.write(snapshot.id, snapshot.to_dict())
+        return snapshots[-1] if len(snapshots) == EXPORT_PAGE_SIZE else None
+
     @commands.guild_only()
     @has_role("Admin")
     @commands.slash_command(
@@ -597,8 +922,7 @@ class ProfileCreator(commands.Cog):
         await ctx.defer()
 
         # Get profile by Steam ID
-        profile_ref = self.db.collection(COLLECTION_NAME).document(steam_id).get()
-        if not profile_ref.exists:
+        if not self.profile_cache.exists(steam_id):
             await ctx.followup.send("❌ Profile not found.")
             return
 
@@ -635,7 +959,8 @@ class ProfileCreator(commands.Cog):
             update_data['last_updated'] = int(datetime.now(timezone.utc).timestamp())
 
             # Update profile
-            profile_ref.reference.update(update_data)
+            self.profile_cache.update(steam_id, update_data)
+            self._reindex_profile(steam_id, self.profile_cache.get(steam_id) or {})
 
             await self._cleanup_command_messages(ctx)
             await ctx.followup.send("✅ Profile updated successfully!")
@@ -678,8 +1003,7 @@ class ProfileCreator(commands.Cog):
             await ctx.followup.send("❌ Invalid Steam ID format. Must be 17 digits.")
             return
 
-        profile_ref = self.db.collection(COLLECTION_NAME).document(steam_id).get()
-        if not profile_ref.exists:
+        if not self.profile_cache.exists(steam_id):
             await ctx.followup.send("❌ Profile not found.")
             return
 
@@ -706,26 +1030,21 @@ class ProfileCreator(commands.Cog):
                 await ctx.followup.send(f"❌ Invalid file type. Allowed types: {', '.join(allowed_types)}")
                 return
 
-            # Create a temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
-                # Download the file
-                await file.save(temp_file.name)
-                
-                # Upload to Storage bucket with consistent naming
-                blob_path = f"{steam_id}/{file_type}{ext}"
-                blob = self.bucket.blob(blob_path)
-                
-                # Upload the file directly, overwriting if it exists
-                blob.upload_from_filename(temp_file.name)
-                blob.content_type = file.content_type  # Preserve the content type
-                blob.make_public()
+            if file.size > MAX_UPLOAD_BYTES:
+                await self._cleanup_command_messages(ctx)
+                await ctx.followup.send(f"❌ File is too large. Maximum size is {MAX_UPLOAD_BYTES // 1024 // 1024} MB.")
+                return
+
+            if file_type == "soundtrack":
+                await self._queue_soundtrack(ctx, file, steam_id)
+                return
 
-            # Clean up temporary file
-            os.unlink(temp_file.name)
+            # Upload to Storage bucket with consistent naming, overwriting if it exists
+            fields = await self._upload_banner(file, steam_id, ext)
 
             # Update profile with new URL
-            profile_ref.reference.update({
-                f"{file_type}_url": blob.public_url,
+            self.profile_cache.update(steam_id, {
+                **fields,
                 "last_updated": int(datetime.now(timezone.utc).timestamp())
             })
 
@@ -736,86 +1055,181 @@ class ProfileCreator(commands.Cog):
         except TimeoutError:
             await self._cleanup_command_messages(ctx)
             await ctx.followup.send("❌ Upload timed out.")
+        except UploadTooLarge:
+            await self._cleanup_command_messages(ctx)
+            await ctx.followup.send(f"❌ File is too large. Maximum size is {MAX_UPLOAD_BYTES // 1024 // 1024} MB.")
+        except InvalidBanner as e:
+            await self._cleanup_command_messages(ctx)
+            await ctx.followup.send(f"❌ Invalid banner: {e}.")
         except Exception as e:
             await self._cleanup_command_messages(ctx)
             log.error(f"Error handling file upload: {e}")
             await ctx.followup.send("❌ An error occurred while processing your file.")
 
-    async def fetch_steam_profiles(self, steam_ids: List[str]) -> Dict[str, str]:
-        """Fetches Steam profiles for given Steam IDs."""
+    async def _wait_for_steam_rate_limit(self) -> None:
+        """Spaces Steam API requests at least STEAM_REQUEST_INTERVAL apart."""
+        async with self.steam_rate_lock:
+            delay = self.steam_next_request - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.steam_next_request = time.monotonic() + STEAM_REQUEST_INTERVAL
+
+    async def fetch_steam_profiles(self, steam_ids: List[str]) -> Optional[Dict[str, str]]:
+        """Fetches Steam profiles for given Steam IDs, or returns None if the request failed."""
         try:
             params = {
                 "key": STEAM_API_KEY,
                 "steamids": ",".join(steam_ids)
             }
-            async with aiohttp.ClientSession() as session:
-                async with session.get(STEAM_API_URL, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        players = data.get("response", {}).get("players", [])
-                        return {
-                            str(player["steamid"]): player["personaname"]
-                            for player in players
-                        }
-            return {}
+            async with self.steam_semaphore:
+                await self._wait_for_steam_rate_limit()
+                self.steam_api_calls += 1
+                # Not retried: failed profiles stay due and are retried within the budget on the next tick
+                response = await self.bot.web_client.get(
+                    STEAM_API_URL, endpoint="steam", retries=0, params=params, timeout=STEAM_REQUEST_TIMEOUT
+                )
+            if response.status == 200:
+                players = response.json().get("response", {}).get("players", [])
+                return {
+                    str(player["steamid"]): player["personaname"]
+                    for player in players
+                }
+            log.warning(f"Steam API returned status {response.status}")
+            return None
         except Exception as e:
             log.error(f"Error fetching Steam profiles: {e}")
-            return {}
+            return None
 
-    async def update_profile_aliases(self, steam_id: str, current_username: str, 
-                                   profile_ref: DocumentSnapshot) -> None:
-        """Updates profile aliases if username has changed."""
-        try:
-            profile_data = profile_ref.to_dict()
-            stored_username = profile_data.get("steam_username")
-            
-            # Initialize aliases array if it doesn't exist
-            if "aliases" not in profile_data:
-                profile_data["aliases"] = []
-
-            # If username has changed, add to aliases
-            if stored_username and stored_username != current_username:
-                alias_entry = {
-                    "steam_username": stored_username,
-                    "date": int(datetime.now(timezone.utc).timestamp())
-                }
-                profile_data["aliases"].append(alias_entry)
-                
-                # Update profile with new username and aliases
-                profile_ref.reference.update({
-                    "steam_username": current_username,
-                    "aliases": profile_data["aliases"],
-                    "date": int(datetime.now(timezone.utc).timestamp())
-                })
-                log.info(f"Updated aliases for Steam ID {steam_id}")
-            elif not stored_username:
-                # If no username stored, just set it
-                profile_ref.reference.update({
-                    "steam_username": current_username,
-                    "date": int(datetime.now(timezone.utc).timestamp())
-                })
+    def get_alias_update(self, current_username: str, profile_ref: DocumentSnapshot) -> Optional[Dict[str, Any]]:
+        """Returns the fields to update if the Steam username changed, or None if nothing changed."""
+        stored_username = (profile_ref.to_dict() or {}).get("steam_username")
+        if stored_username == current_username:
+            return None
 
+        now = int(datetime.now(timezone.utc).timestamp())
+        update = {"steam_username": current_username, "date": now}
+        if stored_username:
+            # ArrayUnion appends server side instead of rewriting the whole aliases array
+            update["aliases"] = ArrayUnion([{"steam_username": stored_username, "date": now}])
+        return update
+
+    async def commit_profile_updates(self, updates: List[Tuple[DocumentReference, Dict[str, Any]]]) -> int:
+        """Writes updates in WriteBatches of up to FIRESTORE_BATCH_LIMIT and returns the number of commits."""
+        commits = 0
+        for i in range(0, len(updates), FIRESTORE_BATCH_LIMIT):
+            batch = self.db.batch()
+            for reference, update in updates[i:i + FIRESTORE_BATCH_LIMIT]:
+                batch.update(reference, update)
+            try:
+                await asyncio.to_thread(batch.commit)
+                commits += 1
+                for reference, update in updates[i:i + FIRESTORE_BATCH_LIMIT]:
+                    if "steam_username" in update:
+                        self.profile_cache.invalidate(reference.id)
+            except Exception as e:
+                log.error(f"Error committing profile updates {i}-{i + FIRESTORE_BATCH_LIMIT}: {e}")
+        return commits
+
+    def get_schedule_update(self, profile_ref: DocumentSnapshot, changed: bool, now: int) -> Dict[str, Any]:
+        """Returns the scheduling fields for a checked profile.
+
+        A name change resets the interval to STEAM_MIN_CHECK_INTERVAL, every
+        unchanged check doubles it up to STEAM_MAX_CHECK_INTERVAL. The next
+        check is jittered by 10% so profiles stay spread over time.
+        """
+        interval = (profile_ref.to_dict() or {}).get("check_interval") or STEAM_DEFAULT_CHECK_INTERVAL
+        interval = STEAM_MIN_CHECK_INTERVAL if changed else min(interval * 2, STEAM_MAX_CHECK_INTERVAL)
+        return {
+            "last_checked": now,
+            "check_interval": interval,
+            "next_check": now + int(interval * random.uniform(0.9, 1.1)),
+        }
+
+    async def schedule_unscheduled_profiles(self) -> None:
+        """Gives profiles without a next_check one, spread evenly over the default interval.
+
+        Runs once on startup for profiles created before the scheduler; it
+        only reads the next_check field of each profile.
+        """
+        try:
+            snapshots = self.db.collection(COLLECTION_NAME).select(["next_check"]).get()
+            unscheduled = [snapshot for snapshot in snapshots if (snapshot.to_dict() or {}).get("next_check") is None]
+            if not unscheduled:
+                return
+            now = int(datetime.now(timezone.utc).timestamp())
+            updates = [
+                (snapshot.reference, {"next_check": now + i * STEAM_DEFAULT_CHECK_INTERVAL // len(unscheduled)})
+                for i, snapshot in enumerate(unscheduled)
+            ]
+            await self.commit_profile_updates(updates)
+            log.info(f"Scheduled Steam refresh for {len(unscheduled)} profiles")
         except Exception as e:
-            log.error(f"Error updating aliases for Steam ID {steam_id}: {e}")
+            log.error(f"Error scheduling Steam profile refresh: {e}")
 
-    @tasks.loop(seconds=3600)
+    @tasks.loop(seconds=STEAM_REFRESH_TICK_SECONDS)
     async def steam_profile_monitor(self) -> None:
-        """Monitors Steam profiles for username changes."""
-        try:
-            log.info("Checking Steam profiles for name changes...")
-            profiles = self.db.collection(COLLECTION_NAME).get()
-            steam_ids = [profile.id for profile in profiles]
+        """Refreshes the Steam profiles that are due, within the Steam API budget.
 
-            for i in range(0, len(steam_ids), BATCH_SIZE):
-                batch_ids = steam_ids[i:i + BATCH_SIZE]
-                steam_data = await self.fetch_steam_profiles(batch_ids)
+        Every tick adds its share of STEAM_API_BUDGET_PER_HOUR to the call
+        allowance and reads only as many due profiles, oldest next_check
+        first, as the allowance can check.
+        """
+        try:
+            self.steam_call_allowance = min(
+                self.steam_call_allowance + STEAM_API_BUDGET_PER_HOUR * STEAM_REFRESH_TICK_SECONDS / 3600,
+                STEAM_MAX_BURST_CALLS,
+            )
+            if self.steam_call_allowance < 1:
+                return
 
-                for steam_id, username in steam_data.items():
-                    profile_ref = next(
-                        (p for p in profiles if p.id == steam_id), None
-                    )
-                    if profile_ref:
-                        await self.update_profile_aliases(steam_id, username, profile_ref)
+            start = time.perf_counter()
+            api_calls = self.steam_api_calls
+            now = int(datetime.now(timezone.utc).timestamp())
+            due = (
+                self.db.collection(COLLECTION_NAME)
+                .where(filter=FieldFilter("next_check", "<=", now))
+                .order_by("next_check")
+                .limit(int(self.steam_call_allowance) * BATCH_SIZE)
+                .get()
+            )
+            if not due:
+                return
+            profiles = {profile.id: profile for profile in due}
+            steam_ids = list(profiles)
+
+            # Batches are fetched concurrently; fetch_steam_profiles bounds and spaces the requests
+            batch_ids = [steam_ids[i:i + BATCH_SIZE] for i in range(0, len(steam_ids), BATCH_SIZE)]
+            batches = await asyncio.gather(*(self.fetch_steam_profiles(ids) for ids in batch_ids))
+            self.steam_call_allowance -= self.steam_api_calls - api_calls
+
+            updates = []
+            renamed_profiles = []
+            changed = 0
+            for ids, steam_data in zip(batch_ids, batches):
+                if steam_data is None:
+                    continue  # Failed request, these profiles stay due
+                for steam_id in ids:
+                    profile_ref = profiles[steam_id]
+                    username = steam_data.get(steam_id)
+                    update = self.get_alias_update(username, profile_ref) if username else None
+                    changed += update is not None
+                    if update is not None:
+                        renamed_profiles.append((steam_id, profile_ref.to_dict() or {}, username))
+                    renamed = update is not None and "aliases" in update
+                    schedule = self.get_schedule_update(profile_ref, renamed, now)
+                    updates.append((profile_ref.reference, {**(update or {}), **schedule}))
+            commits = await self.commit_profile_updates(updates)
+
+            for steam_id, profile, username in renamed_profiles:
+                previous = profile.get("steam_username")
+                aliases = (profile.get("aliases") or []) + ([{"steam_username": previous}] if previous else [])
+                self._reindex_profile(steam_id, {**profile, "steam_username": username, "aliases": aliases})
+
+            log.info(
+                f"Checked {len(updates)} of {len(profiles)} due Steam profiles in {time.perf_counter() - start:.2f}s "
+                f"with {self.steam_api_calls - api_calls} Steam API calls, "
+                f"{changed} changed profiles written in {commits} batch commits"
+            )
 
         except Exception as e:
             log.error(f"Error in Steam profile monitor: {e}")
@@ -1,24 +1,151 @@
+import asyncio
 import discord
 from discord.ext import commands, tasks
-from deep_translator import GoogleTranslator
+from discord.commands import option
+from discord.ext.commands import has_role
 from deep_translator.exceptions import NotValidPayload, LanguageNotSupportedException
 import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Hashable, List, NamedTuple, Optional, Tuple
 from bot import CustomBot
+from firestore_helper import get_firestore_client
+from translation_executor import TranslationExecutor
+from translation_cache import TranslationCache
+from translation_backends import HedgedTranslator, create_backends
+from translation_text import detect_language, split_into_chunks
 import logging
 
 log = logging.getLogger("Translator")
 
+MESSAGE_CACHE_SIZE = 5000  # Recent messages kept to answer reactions without fetch_message
+MAX_TRACKED_REACTIONS = 100_000
+TRANSLATION_CHUNK_CHARS = 1000  # Longer messages are translated as parallel chunks of sentences
+EMBED_DESCRIPTION_LIMIT = 4096
+AUTO_TRANSLATE_WINDOW_SECONDS = 10  # New messages in auto-translate channels are collected for this long
+AUTO_TRANSLATE_QUEUE_SIZE = 500  # Messages waiting for a window; newer ones are dropped while it's full
+DELETED_MESSAGE_TTL = 60  # Deleted message ids are remembered for a few windows, so queued copies are skipped
+
+
+class ExpiringKeys:
+    """Set of keys that expire a fixed ttl after they were last added.
+
+    Since every key gets the same ttl, expiry times are increasing in insertion
+    order and a deque is enough to evict in amortized O(1). Re-adding a key
+    leaves its old deque entry behind; it is skipped when popped because the
+    stored expiry no longer matches. At most max_size keys are kept, the
+    oldest being dropped first.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.expiry: Dict[Hashable, float] = {}  # key -> expiry time
+        self.queue: Deque[Tuple[float, Hashable]] = deque()  # (expiry time, key), oldest first
+
+    def __contains__(self, key: Hashable) -> bool:
+        expiry = self.expiry.get(key)
+        return expiry is not None and expiry > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.expiry)
+
+    def add(self, key: Hashable) -> None:
+        expiry = time.monotonic() + self.ttl
+        self.expiry[key] = expiry
+        self.queue.append((expiry, key))
+        while len(self.expiry) > self.max_size:
+            self._pop_oldest()
+        self.expire()
+
+    def expire(self) -> None:
+        """Evicts every expired key."""
+        now = time.monotonic()
+        while self.queue and self.queue[0][0] <= now:
+            self._pop_oldest()
+
+    def _pop_oldest(self) -> None:
+        expiry, key = self.queue.popleft()
+        if self.expiry.get(key) == expiry:
+            del self.expiry[key]
+
+
+class CachedMessage(NamedTuple):
+    id: int
+    content: str
+    author_name: str
+    author_avatar_url: str
+    author_is_bot: bool
+
+    @staticmethod
+    def from_message(message: discord.Message) -> "CachedMessage":
+        return CachedMessage(
+            message.id,
+            message.content,
+            message.author.display_name,
+            message.author.display_avatar.url,
+            message.author.bot,
+        )
+
+
+class TranslationPages(discord.ui.View):
+    """Translation too long for one embed, one embed per page."""
+
+    def __init__(self, embeds: List[discord.Embed]):
+        super().__init__(timeout=300)
+        self.embeds = embeds
+        self.page = 0
+
+    async def _show_page(self, interaction: discord.Interaction, page: int) -> None:
+        self.page = page % len(self.embeds)
+        await interaction.response.edit_message(embed=self.embeds[self.page], view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, button: discord.ui.Button, interaction: discord.Interaction) -> None:
+        await self._show_page(interaction, self.page - 1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, button: discord.ui.Button, interaction: discord.Interaction) -> None:
+        await self._show_page(interaction, self.page + 1)
+
+
 class Translator(commands.Cog):
     def __init__(self, bot: CustomBot):
         self.bot = bot
         self.emoji_to_language = self.get_language_emoji_mapping()
-        self.processed_reactions = {}
         self.reaction_timeout_seconds = 60 * 5 # 5 minutes
+        self.processed_reactions = ExpiringKeys(self.reaction_timeout_seconds, MAX_TRACKED_REACTIONS)  # (message_id, language_code)
+        self.pending_translations: Dict[Tuple[int, str], asyncio.Future] = {}  # (message_id, language_code) -> in-flight translation
+        self.message_cache: OrderedDict[int, CachedMessage] = OrderedDict()  # message_id -> message, least recent first
+        self.deleted_messages = ExpiringKeys(DELETED_MESSAGE_TTL, MESSAGE_CACHE_SIZE)  # message_id
+        self.message_cache_hits = 0
+        self.message_fetches = 0
+        self.ignored_reactions = 0
+        self.same_language_skips = 0
+        self.db = get_firestore_client()
+        self.auto_translate_channels: Dict[int, List[str]] = {}  # channel_id -> target language codes
+        self.auto_translate_queue: asyncio.Queue[Tuple[int, CachedMessage]] = asyncio.Queue(AUTO_TRANSLATE_QUEUE_SIZE)
+        self.auto_translate_dropped = 0
+        self.auto_translate_batches = 0
+        self.started_at = time.time()
+        self.executor = TranslationExecutor()
+        self.translator = HedgedTranslator(create_backends(bot.web_client, self.executor))
+        self.cache = TranslationCache()
         self.cleanup_task.start()
+        self.auto_translate_task.start()
+
+    def cog_unload(self):
+        self.cleanup_task.cancel()
+        self.auto_translate_task.cancel()
+        self.executor.shutdown()
+        self.cache.close()
 
     @commands.Cog.listener()
     async def on_ready(self):
         log.info("Translator cog is ready")
+        settings = self.db.collection("translator").document("auto_translate").get().to_dict() or {}
+        self.auto_translate_channels = {
+            int(channel_id): languages for channel_id, languages in settings.get("channels", {}).items()
+        }
 
     def get_language_emoji_mapping(self):
         return {
@@ -76,72 +203,353 @@ class Translator(commands.Cog):
             "🇿🇦": "zu",  # Zulu
         }
 
-    @tasks.loop(minutes=5)
+    @tasks.loop(seconds=30)
     async def cleanup_task(self):
-        current_time = time.time()
-        for message_id in list(self.processed_reactions):
-            self.processed_reactions[message_id] = {
-                emoji: timestamp
-                for emoji, timestamp in self.processed_reactions[message_id].items()
-                if current_time - timestamp < self.reaction_timeout_seconds
-            }
-            if not self.processed_reactions[message_id]:
-                del self.processed_reactions[message_id]
+        self.processed_reactions.expire()
+        self.deleted_messages.expire()
+
+    @commands.guild_only()
+    @discord.slash_command(name="translator_stats", description="Show translation queue and latency statistics.")
+    async def translator_stats(self, ctx: discord.ApplicationContext):
+        stats = {
+            **self.executor.stats(),
+            **self.translator.stats(),
+            **self.cache.stats(),
+            **self.message_cache_stats(),
+            "tracked_reactions": len(self.processed_reactions),
+            "same_language_skips": self.same_language_skips,
+            "auto_translate_channels": len(self.auto_translate_channels),
+            "auto_translate_queued": self.auto_translate_queue.qsize(),
+            "auto_translate_dropped": self.auto_translate_dropped,
+            "auto_translate_batches": self.auto_translate_batches,
+        }
+        await ctx.send_response("\n".join(f"**{name}**: {value}" for name, value in stats.items()), ephemeral=True)
+
+    async def translate(self, text: str, language_code: str) -> str:
+        """Translates text, splitting long messages into chunks of sentences translated in parallel.
+
+        Chunks go through the executor, so they share its concurrency limit
+        with every other translation.
+        """
+        chunks = split_into_chunks(text, TRANSLATION_CHUNK_CHARS)
+        if len(chunks) == 1:
+            return await self.translate_chunk(text, language_code)
+
+        translations = await asyncio.gather(*(self.translate_chunk(chunk.strip(), language_code) for chunk in chunks))
+        # Keep the whitespace between chunks, so line breaks at chunk boundaries survive
+        return "".join(
+            translation + chunk[len(chunk.rstrip()):] for translation, chunk in zip(translations, chunks)
+        ).strip()
+
+    async def translate_chunk(self, text: str, language_code: str) -> str:
+        """Translates text, serving repeated phrases from the translation cache."""
+        translated_text = await self.cache.get(text, language_code, self.translator.name)
+        if translated_text is None:
+            translated_text = await self.translator.translate(text, language_code)
+            await self.cache.set(text, language_code, self.translator.name, translated_text)
+        return translated_text
+
+    def message_cache_stats(self) -> Dict[str, str]:
+        hours = max((time.time() - self.started_at) / 3600, 1 / 60)
+        avoided = self.message_cache_hits + self.ignored_reactions
+        return {
+            "message_cache_entries": len(self.message_cache),
+            "message_fetches": self.message_fetches,
+            "rest_calls_avoided": avoided,
+            "rest_calls_avoided_per_hour": f"{avoided / hours:.1f}",
+        }
+
+    def _cache_message(self, message: CachedMessage) -> None:
+        self.message_cache[message.id] = message
+        self.message_cache.move_to_end(message.id)
+        while len(self.message_cache) > MESSAGE_CACHE_SIZE:
+            self.message_cache.popitem(last=False)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.guild is None:
+            return
+        cached = CachedMessage.from_message(message)
+        self._cache_message(cached)
+
+        if message.channel.id in self.auto_translate_channels and not message.author.bot and message.content:
+            try:
+                self.auto_translate_queue.put_nowait((message.channel.id, cached))
+            except asyncio.QueueFull:
+                # Translation is falling behind; shed new messages instead of growing without bound
+                if self.auto_translate_dropped % 100 == 0:
+                    log.warning(f"Auto-translate queue is full, dropped {self.auto_translate_dropped + 1} messages so far")
+                self.auto_translate_dropped += 1
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        cached = self.message_cache.get(payload.message_id)
+        if cached and "content" in payload.data:
+            self.message_cache[payload.message_id] = cached._replace(content=payload.data["content"])
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        self.message_cache.pop(payload.message_id, None)
+        self.deleted_messages.add(payload.message_id)
+
+    async def get_message(self, channel: discord.abc.Messageable, message_id: int) -> Optional[CachedMessage]:
+        """Returns a recently seen message from the cache, fetching it over REST on a miss."""
+        cached = self.message_cache.get(message_id)
+        if cached is not None:
+            self.message_cache.move_to_end(message_id)
+            self.message_cache_hits += 1
+            return cached
+
+        self.message_fetches += 1
+        try:
+            message = await channel.fetch_message(message_id)
+        except discord.HTTPException as e:
+            log.warning(f"Cannot fetch message {message_id}: {e}")
+            return None
+        cached = CachedMessage.from_message(message)
+        self._cache_message(cached)
+        return cached
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
         if payload.user_id == self.bot.user.id:
             return
 
+        # Most reactions aren't flags; filter them before any API call
+        emoji = str(payload.emoji)
+        language_code = self.emoji_to_language.get(emoji)
+        if not language_code:
+            self.ignored_reactions += 1
+            return
+
         channel = self.bot.get_channel(payload.channel_id)
         if not channel:
             return
 
-        message = await channel.fetch_message(payload.message_id)
-        if not message:
+        key = (payload.message_id, language_code)
+        if key in self.processed_reactions:
             return
 
-        if message.author.bot:
+        # Reactions racing on the same message and language share one fetch, one translation and one
+        # embed. The future is registered before the first await, so no reaction can slip in between.
+        pending = self.pending_translations.get(key)
+        if pending is not None:
+            await pending
             return
 
-        emoji = str(payload.emoji)
-        language_code = self.emoji_to_language.get(emoji)
+        pending = self.pending_translations[key] = asyncio.get_running_loop().create_future()
+        try:
+            message = await self.get_message(channel, payload.message_id)
+            if message and not message.author_is_bot:
+                pending.set_result(await self.translate_reaction(channel, message, emoji, language_code))
+        finally:
+            if not pending.done():
+                pending.set_result(None)
+            del self.pending_translations[key]
 
-        if language_code:
-            message_id = message.id
+    async def translate_reaction(self, channel: discord.abc.Messageable, message: CachedMessage,
+                                 emoji: str, language_code: str) -> Optional[str]:
+        """Translates message, posts the embed and returns the translation, or None on failure."""
+        if detect_language(message.content) == language_code:
+            # Already in the target language, nothing to translate
+            self.same_language_skips += 1
+            self.processed_reactions.add((message.id, language_code))
+            return None
 
-            if message_id in self.processed_reactions and emoji in self.processed_reactions[message_id]:
-                return
-
-            original_message = message.content
-            original_author = message.author
-
-            try:
-                translated_text = GoogleTranslator(source="auto", target=language_code).translate(original_message)
+        try:
+            translated_text = await self.translate(message.content, language_code)
 
+            pages = [page.strip() for page in split_into_chunks(translated_text, EMBED_DESCRIPTION_LIMIT)]
+            embeds = []
+            for number, page in enumerate(pages, start=1):
                 embed = discord.Embed(
-                    description=translated_text,
+                    description=page,
                     color=discord.Color.blue(),
                 )
-                embed.set_author(name=original_author.display_name, icon_url=original_author.avatar.url)
+                embed.set_author(name=message.author_name, icon_url=message.author_avatar_url)
+                if len(pages) > 1:
+                    embed.set_footer(text=f"Page {number}/{len(pages)}")
+                embeds.append(embed)
+
+            if len(embeds) == 1:
+                await channel.send(embed=embeds[0])
+            else:
+                await channel.send(embed=embeds[0], view=TranslationPages(embeds))
+
+            self.processed_reactions.add((message.id, language_code))
+            return translated_text
+
+        except LanguageNotSupportedException:
+            await channel.send(f"Sorry, the language for `{emoji}` is not supported.")
+        except NotValidPayload:
+            await channel.send("The message could not be translated. It may be empty or invalid.")
+        except asyncio.TimeoutError:
+            await channel.send("The translation service took too long to respond. Please try again later.")
+        except Exception as e:
+            log.error(f"Translation error: {e}")
+            await channel.send("An unexpected error occurred while translating.")
+        return None
+
+    @commands.guild_only()
+    @discord.slash_command(name="auto_translate", description="Show the channels that are translated automatically.")
+    async def show_auto_translate(self, ctx: discord.ApplicationContext):
+        lines = [
+            f"<#{channel_id}>: {', '.join(languages)}"
+            for channel_id, languages in self.auto_translate_channels.items()
+            if ctx.guild.get_channel(channel_id)
+        ]
+        await ctx.send_response("\n".join(lines) or "No channels are translated automatically.", ephemeral=True)
+
+    @commands.guild_only()
+    @has_role("Admin")
+    @discord.slash_command(name="auto_translate_set", description="Automatically translate this channel.")
+    @option("languages", "Comma separated target language codes, e.g. en,pt,ja", type=str, required=True)
+    async def auto_translate_set(self, ctx: discord.ApplicationContext, languages: str):
+        supported = set(self.emoji_to_language.values())
+        codes = list(dict.fromkeys(code.strip() for code in languages.split(",") if code.strip()))
+        unsupported = [code for code in codes if code not in supported]
+        if not codes or unsupported:
+            await ctx.send_response(f"Unsupported language codes: {', '.join(unsupported) or languages}", ephemeral=True)
+            return
+
+        self.auto_translate_channels[ctx.channel.id] = codes
+        self.save_auto_translate_channels()
+        await ctx.send_response(f"Messages in this channel will be translated to {', '.join(codes)}.", ephemeral=True)
+
+    @commands.guild_only()
+    @has_role("Admin")
+    @discord.slash_command(name="auto_translate_off", description="Stop automatically translating this channel.")
+    async def auto_translate_off(self, ctx: discord.ApplicationContext):
+        if self.auto_translate_channels.pop(ctx.channel.id, None) is None:
+            await ctx.send_response("This channel isn't translated automatically.", ephemeral=True)
+            return
+        self.save_auto_translate_channels()
+        await ctx.send_response("Automatic translation has been turned off for this channel.", ephemeral=True)
+
+    def save_auto_translate_channels(self) -> None:
+        self.db.collection("translator").document("auto_translate").set({
+            "channels": {str(channel_id): languages for channel_id, languages in self.auto_translate_channels.items()}
+        })
 
-                await channel.send(embed=embed)
+    @tasks.loop(seconds=AUTO_TRANSLATE_WINDOW_SECONDS)
+    async def auto_translate_task(self):
+        """Translates the messages collected during the last window, one embed per channel."""
+        windows: Dict[int, List[CachedMessage]] = {}
+        while not self.auto_translate_queue.empty():
+            channel_id, message = self.auto_translate_queue.get_nowait()
+            windows.setdefault(channel_id, []).append(message)
 
-                if message_id not in self.processed_reactions:
-                    self.processed_reactions[message_id] = {}
-                self.processed_reactions[message_id][emoji] = time.time()
+        # The next window starts when this one is posted, so a slow backend fills the queue instead of piling up tasks
+        results = await asyncio.gather(*(
+            self.post_auto_translations(channel_id, messages) for channel_id, messages in windows.items()
+        ), return_exceptions=True)
+        for channel_id, result in zip(windows, results):
+            if isinstance(result, Exception):
+                log.error(f"Auto-translation for channel {channel_id} failed: {result}")
 
-            except LanguageNotSupportedException:
-                await channel.send(f"Sorry, the language for `{emoji}` is not supported.")
-            except NotValidPayload:
-                await channel.send("The message could not be translated. It may be empty or invalid.")
-            except Exception as e:
-                print(f"Translation error: {e}")
-                await channel.send("An unexpected error occurred while translating.")
+    async def post_auto_translations(self, channel_id: int, messages: List[CachedMessage]) -> None:
+        languages = self.auto_translate_channels.get(channel_id)
+        channel = self.bot.get_channel(channel_id)
+        if not languages or not channel:
+            return
+
+        # Edits during the window are reflected in the message cache; messages evicted from it keep their queued copy
+        messages = [self.message_cache.get(message.id, message) for message in messages]
+        messages = [message for message in messages if message.id not in self.deleted_messages and message.content]
+        results = await asyncio.gather(
+            *(self.translate_batch([message.content for message in messages], language) for language in languages),
+            return_exceptions=True,
+        )
+
+        language_to_emoji = {language: emoji for emoji, language in self.emoji_to_language.items()}
+        sections = []
+        for language, translations in zip(languages, results):
+            if isinstance(translations, Exception):
+                log.error(f"Auto-translation to {language} failed: {translations}")
+                continue
+            lines = [
+                f"**{message.author_name}**: {translation}"
+                for message, translation in zip(messages, translations)
+                if translation is not None
+            ]
+            if lines:
+                sections.append(f"{language_to_emoji.get(language, language)}\n" + "\n".join(lines))
+        if not sections:
+            return
+
+        pages = [page.strip() for page in split_into_chunks("\n\n".join(sections), EMBED_DESCRIPTION_LIMIT)]
+        for page in pages:
+            try:
+                await channel.send(embed=discord.Embed(description=page, color=discord.Color.blue()))
+            except discord.HTTPException as e:
+                # Missing permissions or a deleted channel only affect this channel
+                log.error(f"Failed to post auto-translations in channel {channel_id}: {e}")
+                return
+
+    async def translate_batch(self, texts: List[str], language_code: str) -> List[Optional[str]]:
+        """Translates several messages to one language with as few backend calls as possible.
+
+        Cached messages are served from the cache and messages already in the
+        target language come back as None. The rest are joined line by line
+        into requests of up to TRANSLATION_CHUNK_CHARS; if a request fails or
+        a backend doesn't return one line per message, that request falls
+        back to per-message translation. Messages that still fail come back as
+        None, without affecting the others.
+        """
+        lines = [" ".join(text.split()) for text in texts]
+        translations: List[Optional[str]] = [None] * len(lines)
+        missing: List[int] = []
+        for i, line in enumerate(lines):
+            if detect_language(line) == language_code:
+                self.same_language_skips += 1
+                continue
+            translations[i] = await self.cache.get(line, language_code, self.translator.name)
+            if translations[i] is None:
+                missing.append(i)
+
+        batches: List[List[int]] = []
+        size = 0
+        for i in missing:
+            if batches and size + len(lines[i]) + 1 <= TRANSLATION_CHUNK_CHARS:
+                batches[-1].append(i)
+                size += len(lines[i]) + 1
+            else:
+                batches.append([i])
+                size = len(lines[i])
+
+        async def translate_lines(batch: List[int]) -> None:
+            if len(batch) > 1:
+                try:
+                    translated = await self.translator.translate("\n".join(lines[i] for i in batch), language_code)
+                except Exception as e:
+                    log.warning(f"Batched translation of {len(batch)} messages to {language_code} failed: {e}")
+                    translated = ""
+                translated_lines = [line.strip() for line in translated.split("\n") if line.strip()]
+                if len(translated_lines) == len(batch):
+                    self.auto_translate_batches += 1
+                    for i, translation in zip(batch, translated_lines):
+                        translations[i] = translation
+                        await self.cache.set(lines[i], language_code, self.translator.name, translation)
+                    return
+            for i in batch:
+                try:
+                    translations[i] = await self.translate(lines[i], language_code)
+                except Exception as e:
+                    log.error(f"Translation of a message to {language_code} failed: {e}")
+
+        results = await asyncio.gather(*(translate_lines(batch) for batch in batches), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                log.error(f"Translation of a batch to {language_code} failed: {result}")
+        return translations
 
     @cleanup_task.before_loop
     async def before_cleanup_task(self):
         await self.bot.wait_until_ready()
 
+    @auto_translate_task.before_loop
+    async def before_auto_translate_task(self):
+        await self.bot.wait_until_ready()
+
 def setup(bot : CustomBot) -> None:
     bot.add_cog(Translator(bot))
\ No newline at end of file
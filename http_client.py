@@ -0,0 +1,283 @@
+from bisect import bisect_left
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Mapping, NamedTuple, Optional
+from urllib.parse import urlsplit
+import aiohttp
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+
+log = logging.getLogger("HttpClient")
+
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))  # Open connections in total
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "10"))
+HTTP_DNS_CACHE_TTL = 300  # Seconds a resolved host is reused
+HTTP_KEEPALIVE_TIMEOUT = 60  # Seconds an idle connection is kept; most APIs are polled more often
+HTTP_DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10)  # API calls
+# Streamed bodies, e.g. downloads of large attachments, may take as long as they
+# keep making progress; only a stalled connect or read times out
+HTTP_STREAM_TIMEOUT = aiohttp.ClientTimeout(total=None, connect=10, sock_read=60)
+HTTP_RETRIES = 2  # Retries of idempotent requests, on top of the first attempt
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failures that open an endpoint's circuit
+BREAKER_RESET_SECONDS = 30  # Time an open circuit rejects requests before letting a trial request through
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Upper bounds in seconds
+
+
+class CircuitOpen(Exception):
+    """Raised instead of sending a request to an endpoint whose circuit is open."""
+
+
+class HttpResponse(NamedTuple):
+    status: int
+    headers: Mapping[str, str]
+    body: bytes
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.body.decode(encoding)
+
+    def json(self, encoding: str = "utf-8") -> Any:
+        return json.loads(self.body.decode(encoding))
+
+
+def create_session() -> aiohttp.ClientSession:
+    """Creates the bot's shared session, with bounded per-host pools and cached DNS."""
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=HTTP_DEFAULT_TIMEOUT)
+
+
+class LatencyHistogram:
+    """Request latencies counted in LATENCY_BUCKETS, so percentiles cost no memory per request."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # The last bucket counts everything slower
+        self.total = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += 1
+
+    def percentile(self, share: float) -> Optional[float]:
+        """Returns the upper bound of the bucket holding the given share of requests, or None above the last one."""
+        if not self.total:
+            return None
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            seen += count
+            if seen >= share * self.total:
+                return bound
+        return None
+
+
+class CircuitBreaker:
+    """Stops requests to an endpoint after BREAKER_FAILURE_THRESHOLD consecutive failures.
+
+    Once BREAKER_RESET_SECONDS have passed, one trial request is let
+    through (half open); its success closes the circuit, its failure opens
+    it again. A trial that ends any other way (cancelled, or an unexpected
+    error) calls end_trial, so the next request becomes the trial.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self.opened_at < BREAKER_RESET_SECONDS else "half open"
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at < BREAKER_RESET_SECONDS or self.trial:
+            return False
+        self.trial = True
+        return True
+
+    def end_trial(self) -> None:
+        self.trial = False
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            log.info(f"Circuit for {self.endpoint} closed")
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.trial = False
+        if self.failures >= BREAKER_FAILURE_THRESHOLD:
+            if self.opened_at is None:
+                self.opened += 1
+                log.warning(f"Circuit for {self.endpoint} opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+
+
+class EndpointStats:
+    def __init__(self, endpoint: str):
+        self.breaker = CircuitBreaker(endpoint)
+        self.latency = LatencyHistogram()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0  # Requests not sent because the circuit was open
+
+
+class HttpClient:
+    """Outbound HTTP for every cog, on top of the session created in main.py.
+
+    Requests are grouped by endpoint, a short name given by the caller that
+    defaults to the URL's host. Every endpoint has its own circuit breaker
+    and latency histogram. Connection errors, timeouts and RETRY_STATUSES
+    are retried with full jitter exponential backoff, honoring Retry-After;
+    only idempotent methods are retried unless retries is passed.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+        self.endpoints: Dict[str, EndpointStats] = {}
+
+    def _endpoint(self, url: str, endpoint: Optional[str]) -> EndpointStats:
+        name = endpoint or urlsplit(str(url)).hostname or "unknown"
+        if name not in self.endpoints:
+            self.endpoints[name] = EndpointStats(name)
+        return self.endpoints[name]
+
+    def circuit(self, endpoint: str) -> CircuitBreaker:
+        """Returns the circuit breaker of an endpoint, e.g. to tell whether a failure opened it."""
+        return self._endpoint(endpoint, endpoint).breaker
+
+    def _check_circuit(self, stats: EndpointStats) -> bool:
+        """Raises CircuitOpen if the request can't be sent. Returns whether it's the half open trial request."""
+        if not stats.breaker.allow():
+            stats.rejected += 1
+            raise CircuitOpen(f"circuit for {stats.breaker.endpoint} is open")
+        return stats.breaker.opened_at is not None
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), RETRY_MAX_DELAY))
+        return delay
+
+    async def request(self, method: str, url: str, *, endpoint: Optional[str] = None,
+                      retries: Optional[int] = None, **kwargs: Any) -> HttpResponse:
+        """Sends a request and reads the whole response.
+
+        Responses with any status are returned; after the last retry that
+        includes RETRY_STATUSES. Raises CircuitOpen, or the last connection
+        error or timeout.
+        """
+        stats = self._endpoint(url, endpoint)
+        if retries is None:
+            retries = HTTP_RETRIES if method.upper() in IDEMPOTENT_METHODS else 0
+
+        attempt = 0
+        while True:
+            trial = self._check_circuit(stats)
+            stats.requests += 1
+            start = time.perf_counter()
+            result: Optional[HttpResponse] = None
+            error: Optional[Exception] = None
+            retry_after = None
+            try:
+                try:
+                    async with self.session.request(method, url, **kwargs) as response:
+                        body = await response.read()
+                    stats.latency.observe(time.perf_counter() - start)
+                    result = HttpResponse(response.status, response.headers, body)
+                    if response.status not in RETRY_STATUSES:
+                        stats.breaker.record_success()  # The endpoint answered, even if with a client error
+                        return result
+                    retry_after = response.headers.get("Retry-After")
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    stats.latency.observe(time.perf_counter() - start)
+                    error = e
+
+                stats.failures += 1
+                stats.breaker.record_failure()
+            finally:
+                if trial:
+                    stats.breaker.end_trial()
+            if attempt >= retries or stats.breaker.state != "closed":
+                if error is not None:
+                    raise error
+                return result
+
+            await asyncio.sleep(self._retry_delay(attempt, retry_after))
+            attempt += 1
+            stats.retries += 1
+
+    async def get(self, url: str, **kwargs: Any) -> HttpResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> HttpResponse:
+        return await self.request("POST", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, *, endpoint: Optional[str] = None,
+                     **kwargs: Any) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Sends a request whose body the caller reads itself, e.g. a download. Not retried.
+
+        Only the connection and the response status count towards the
+        circuit breaker, not errors while the caller reads the body. The
+        latency recorded is the time to the response headers. Uses
+        HTTP_STREAM_TIMEOUT unless a timeout is passed.
+        """
+        kwargs.setdefault("timeout", HTTP_STREAM_TIMEOUT)
+        stats = self._endpoint(url, endpoint)
+        trial = self._check_circuit(stats)
+        stats.requests += 1
+        start = time.perf_counter()
+        try:
+            try:
+                response = await self.session.request(method, url, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                stats.failures += 1
+                stats.breaker.record_failure()
+                raise
+            stats.latency.observe(time.perf_counter() - start)
+            if response.status in RETRY_STATUSES:
+                stats.failures += 1
+                stats.breaker.record_failure()
+            else:
+                stats.breaker.record_success()  # The endpoint answered, even if with a client error
+            # Errors while the caller reads the body, raise_for_status included, are the caller's
+            async with response:
+                yield response
+        finally:
+            if trial:
+                stats.breaker.end_trial()
+
+    def stats(self) -> Dict[str, str]:
+        """Returns a summary line per endpoint."""
+        def milliseconds(seconds: Optional[float]) -> str:
+            return f"≤{seconds * 1000:.0f} ms" if seconds is not None else f">{LATENCY_BUCKETS[-1] * 1000:.0f} ms"
+
+        summary = {}
+        for name, stats in sorted(self.endpoints.items()):
+            line = f"{stats.requests} requests, {stats.retries} retries, {stats.failures} failures"
+            if stats.latency.total:
+                line += f", p50 {milliseconds(stats.latency.percentile(0.5))}, p95 {milliseconds(stats.latency.percentile(0.95))}"
+            line += f", circuit {stats.breaker.state}"
+            if stats.rejected:
+                line += f" ({stats.rejected} rejected)"
+            summary[name] = line
+        return summary
@@ -0,0 +1,330 @@
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+from leaderboard_model import LeaderboardModel, CLANS_CATEGORY
+
+log = logging.getLogger("LeaderboardHistory")
+
+HISTORY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "leaderboard_history")
+HISTORY_RETENTION_DAYS = 30
+HISTORY_MAX_BYTES = 256 * 1024 * 1024  # 256 MiB across every category
+SEGMENT_SUFFIX = ".seg"
+
+# Player values can be fractional (e.g. MostLongestKill), so they are stored
+# as fixed point with two decimals. Clan XP is stored as is.
+CLAN_VALUE_SCALE = 1
+PLAYER_VALUE_SCALE = 100
+
+NAMES_RECORD = b"N"
+SNAPSHOT_RECORD = b"S"
+# Columns are written with array and read back with memoryview.cast, both in
+# native byte order, so headers use native order too (without padding).
+NAMES_HEADER = struct.Struct("=II")  # first name id, byte length of the newline separated names
+SNAPSHOT_HEADER = struct.Struct("=qI")  # unix timestamp, row count
+OVERFLOW_COUNT = struct.Struct("=I")  # followed by sorted uint32 row positions and their int64 absolute values
+INT32_MIN = -2 ** 31
+INT32_MAX = 2 ** 31 - 1
+
+
+def _value_scale(category: str) -> int:
+    return CLAN_VALUE_SCALE if category == CLANS_CATEGORY else PLAYER_VALUE_SCALE
+
+
+def _iter_records(buffer):
+    """Yields (kind, offset) for every complete record, then (None, valid end offset)."""
+    offset = 0
+    size = len(buffer)
+    while offset < size:
+        kind = bytes(buffer[offset:offset + 1])
+        start = offset + 1
+        if kind == NAMES_RECORD:
+            if start + NAMES_HEADER.size > size:
+                break
+            _, length = NAMES_HEADER.unpack_from(buffer, start)
+            end = start + NAMES_HEADER.size + length
+        elif kind == SNAPSHOT_RECORD:
+            if start + SNAPSHOT_HEADER.size > size:
+                break
+            _, count = SNAPSHOT_HEADER.unpack_from(buffer, start)
+            overflow_at = start + SNAPSHOT_HEADER.size + 12 * count
+            if overflow_at + OVERFLOW_COUNT.size > size:
+                break
+            (overflow_count,) = OVERFLOW_COUNT.unpack_from(buffer, overflow_at)
+            end = overflow_at + OVERFLOW_COUNT.size + 12 * overflow_count
+        else:
+            break
+        if end > size:
+            break
+        yield kind, start
+        offset = end
+    yield None, offset
+
+
+def _read_names(buffer, start: int) -> Tuple[int, List[bytes]]:
+    first_id, length = NAMES_HEADER.unpack_from(buffer, start)
+    names_at = start + NAMES_HEADER.size
+    return first_id, bytes(buffer[names_at:names_at + length]).split(b"\n")
+
+
+def _read_overflow(buffer, overflow_at: int) -> Dict[int, int]:
+    """Returns the whole overflow table of a snapshot as {row position: absolute value}."""
+    (overflow_count,) = OVERFLOW_COUNT.unpack_from(buffer, overflow_at)
+    positions_at = overflow_at + OVERFLOW_COUNT.size
+    values_at = positions_at + 4 * overflow_count
+    positions = struct.unpack_from(f"={overflow_count}I", buffer, positions_at)
+    values = struct.unpack_from(f"={overflow_count}q", buffer, values_at)
+    return dict(zip(positions, values))
+
+
+def _read_overflow_value(buffer, overflow_at: int, position: int) -> int:
+    """Binary searches the overflow table of a snapshot for one row position."""
+    (overflow_count,) = OVERFLOW_COUNT.unpack_from(buffer, overflow_at)
+    positions_at = overflow_at + OVERFLOW_COUNT.size
+    positions = buffer[positions_at:positions_at + 4 * overflow_count].cast("I")
+    index = bisect_left(positions, position)
+    positions.release()
+    (value,) = struct.unpack_from("=q", buffer, positions_at + 4 * overflow_count + 8 * index)
+    return value
+
+
+class _SegmentWriter:
+    """Append-only writer for one category's segment of the current day.
+
+    A segment is a sequence of records:
+      N: names appended to the segment's dictionary, ids assigned in order.
+      S: a snapshot with three columns (sorted name ids, ranks, value deltas).
+    The first snapshot of a segment holds every row. Later ones only hold the
+    rows whose rank or value changed, plus rank 0 rows for entries that left
+    the leaderboard. Values are int32 deltas against the previous value of
+    the same name in the segment; deltas that don't fit are written as
+    INT32_MIN with the absolute value in the snapshot's overflow table.
+    Segments are self-contained so retention can delete whole files.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.names: Dict[str, int] = {}
+        self.last_rows: Dict[int, Tuple[int, int]] = {}  # name id -> (rank, value)
+        if os.path.exists(path):
+            valid_size = self._replay()
+            # Drop a record left half-written by a crash
+            if valid_size != os.path.getsize(path):
+                with open(path, "r+b") as f:
+                    f.truncate(valid_size)
+
+    def _replay(self) -> int:
+        """Rebuilds the dictionary and delta bases from the existing segment."""
+        with open(self.path, "rb") as f:
+            buffer = memoryview(f.read())
+
+        for kind, start in _iter_records(buffer):
+            if kind == NAMES_RECORD:
+                first_id, names = _read_names(buffer, start)
+                for i, name in enumerate(names):
+                    self.names[name.decode("utf-8", "replace")] = first_id + i
+            elif kind == SNAPSHOT_RECORD:
+                _, count = SNAPSHOT_HEADER.unpack_from(buffer, start)
+                ids_at = start + SNAPSHOT_HEADER.size
+                name_ids = buffer[ids_at:ids_at + 4 * count].cast("I").tolist()
+                ranks = buffer[ids_at + 4 * count:ids_at + 8 * count].cast("I").tolist()
+                deltas = buffer[ids_at + 8 * count:ids_at + 12 * count].cast("i").tolist()
+                overflow = _read_overflow(buffer, ids_at + 12 * count)
+                for position, name_id in enumerate(name_ids):
+                    previous = self.last_rows.get(name_id, (0, 0))[1]
+                    value = overflow[position] if deltas[position] == INT32_MIN else previous + deltas[position]
+                    self.last_rows[name_id] = (ranks[position], value)
+            else:
+                return start
+
+    def append(self, timestamp: int, rows: List[Tuple[str, int, int]]) -> None:
+        """Appends a snapshot of (name, rank, scaled value) rows."""
+        out = bytearray()
+        new_names = []
+        current = {}
+        for name, rank, value in rows:
+            name = name.replace("\n", " ")
+            name_id = self.names.get(name)
+            if name_id is None:
+                name_id = self.names[name] = len(self.names)
+                new_names.append(name)
+            current[name_id] = (rank, value)
+
+        if new_names:
+            encoded = "\n".join(new_names).encode("utf-8")
+            out += NAMES_RECORD + NAMES_HEADER.pack(len(self.names) - len(new_names), len(encoded)) + encoded
+
+        changed = {name_id: row for name_id, row in current.items() if self.last_rows.get(name_id) != row}
+        for name_id, (rank, value) in self.last_rows.items():
+            if rank and name_id not in current:
+                changed[name_id] = (0, value)
+
+        name_ids = array("I", sorted(changed))
+        ranks = array("I")
+        deltas = array("i")
+        overflow_positions = array("I")
+        overflow_values = array("q")
+        for position, name_id in enumerate(name_ids):
+            rank, value = changed[name_id]
+            delta = value - self.last_rows.get(name_id, (0, 0))[1]
+            ranks.append(rank)
+            if INT32_MIN < delta <= INT32_MAX:
+                deltas.append(delta)
+            else:
+                deltas.append(INT32_MIN)
+                overflow_positions.append(position)
+                overflow_values.append(value)
+            self.last_rows[name_id] = (rank, value)
+
+        out += SNAPSHOT_RECORD + SNAPSHOT_HEADER.pack(timestamp, len(name_ids))
+        out += name_ids.tobytes() + ranks.tobytes() + deltas.tobytes()
+        out += OVERFLOW_COUNT.pack(len(overflow_positions)) + overflow_positions.tobytes() + overflow_values.tobytes()
+
+        with open(self.path, "ab") as f:
+            f.write(out)
+
+
+class LeaderboardHistory:
+    """Local time-series store of leaderboard snapshots, one directory per category.
+
+    Writes and reads do blocking disk I/O and should be run off the event loop.
+    """
+
+    def __init__(self, directory: str = HISTORY_DIR, retention_days: int = HISTORY_RETENTION_DAYS,
+                 max_bytes: int = HISTORY_MAX_BYTES):
+        self.directory = directory
+        self.retention_days = retention_days
+        self.max_bytes = max_bytes
+        self.writers: Dict[str, _SegmentWriter] = {}  # category -> writer for today's segment
+        self.lock = threading.Lock()
+
+    def _category_dir(self, category: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^A-Za-z0-9_-]", "_", category))
+
+    def record(self, leaderboard: LeaderboardModel, timestamp: int) -> None:
+        """Appends a snapshot of every category in the leaderboard."""
+        day = datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+        with self.lock:
+            for category, entries in leaderboard.categories.items():
+                scale = _value_scale(category)
+                rows = [(entry.key, entry.rank, int(round(entry.value * scale))) for entry in entries]
+
+                category_dir = self._category_dir(category)
+                path = os.path.join(category_dir, f"{day}{SEGMENT_SUFFIX}")
+                writer = self.writers.get(category)
+                if writer is None or writer.path != path:
+                    os.makedirs(category_dir, exist_ok=True)
+                    writer = self.writers[category] = _SegmentWriter(path)
+                writer.append(timestamp, rows)
+
+            self._enforce_limits(timestamp)
+
+    def read_series(self, category: str, name: str, days: int = HISTORY_RETENTION_DAYS) -> List[Tuple[int, int, float]]:
+        """Returns (timestamp, rank, value) samples for one entry over the last days."""
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        first_segment = f"{since.strftime('%Y-%m-%d')}{SEGMENT_SUFFIX}"
+        category_dir = self._category_dir(category)
+        scale = _value_scale(category)
+        encoded_name = name.replace("\n", " ").encode("utf-8")
+        series = []
+
+        try:
+            segments = sorted(s for s in os.listdir(category_dir) if s.endswith(SEGMENT_SUFFIX) and s >= first_segment)
+        except FileNotFoundError:
+            return series
+
+        for segment in segments:
+            try:
+                with open(os.path.join(category_dir, segment), "rb") as f:
+                    if os.fstat(f.fileno()).st_size == 0:
+                        continue
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        buffer = memoryview(mapped)
+                        try:
+                            self._read_segment(buffer, encoded_name, scale, since.timestamp(), series)
+                        finally:
+                            buffer.release()
+            except FileNotFoundError:
+                continue  # Pruned while reading
+        return series
+
+    def _read_segment(self, buffer, encoded_name: bytes, scale: int, since: float, series: list) -> None:
+        name_id = None
+        rank = value = 0
+        for kind, start in _iter_records(buffer):
+            if kind == NAMES_RECORD and name_id is None:
+                first_id, names = _read_names(buffer, start)
+                try:
+                    name_id = first_id + names.index(encoded_name)
+                except ValueError:
+                    pass
+            elif kind == SNAPSHOT_RECORD and name_id is not None:
+                row = self._read_row(buffer, start, name_id, value)
+                if row is not None:
+                    rank, value = row
+                timestamp = SNAPSHOT_HEADER.unpack_from(buffer, start)[0]
+                if rank and timestamp >= since:
+                    series.append((timestamp, rank, value / scale))
+
+    def _read_row(self, buffer, start: int, name_id: int, previous: int) -> Optional[Tuple[int, int]]:
+        """Returns (rank, value) for name_id if the snapshot at start holds a row for it."""
+        _, count = SNAPSHOT_HEADER.unpack_from(buffer, start)
+        ids_at = start + SNAPSHOT_HEADER.size
+        name_ids = buffer[ids_at:ids_at + 4 * count].cast("I")
+        position = bisect_left(name_ids, name_id)
+        found = position < count and name_ids[position] == name_id
+        name_ids.release()
+        if not found:
+            return None
+
+        ranks_at = ids_at + 4 * count + 4 * position
+        deltas_at = ids_at + 8 * count + 4 * position
+        (rank,) = struct.unpack_from("=I", buffer, ranks_at)
+        (delta,) = struct.unpack_from("=i", buffer, deltas_at)
+        if delta == INT32_MIN:
+            return rank, _read_overflow_value(buffer, ids_at + 12 * count, position)
+        return rank, previous + delta
+
+    def _segments(self) -> List[Tuple[str, str, int]]:
+        """Returns (segment name, path, size) for every segment, oldest first."""
+        segments = []
+        if not os.path.isdir(self.directory):
+            return segments
+        for category in os.listdir(self.directory):
+            category_dir = os.path.join(self.directory, category)
+            if not os.path.isdir(category_dir):
+                continue
+            for segment in os.listdir(category_dir):
+                if segment.endswith(SEGMENT_SUFFIX):
+                    path = os.path.join(category_dir, segment)
+                    segments.append((segment, path, os.path.getsize(path)))
+        segments.sort()
+        return segments
+
+    def _enforce_limits(self, timestamp: int) -> None:
+        """Deletes segments past the retention window, then oldest first until under max_bytes."""
+        cutoff = datetime.fromtimestamp(timestamp, timezone.utc) - timedelta(days=self.retention_days)
+        oldest_kept = f"{cutoff.strftime('%Y-%m-%d')}{SEGMENT_SUFFIX}"
+        active = {writer.path for writer in self.writers.values()}
+        segments = self._segments()
+        total = sum(size for _, _, size in segments)
+
+        for segment, path, size in segments:
+            if segment >= oldest_kept and total <= self.max_bytes:
+                break
+            if path in active:
+                continue
+            os.remove(path)
+            total -= size
+            log.info(f"Pruned leaderboard history segment {path}")
+
+    def usage(self) -> Tuple[int, int]:
+        """Returns (total bytes, segment count) of the store."""
+        segments = self._segments()
+        return sum(size for _, _, size in segments), len(segments)
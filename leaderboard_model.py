@@ -0,0 +1,101 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+from search_index import SearchIndex
+
+CLANS_CATEGORY = "TopClans"
+
+
+class ClanEntry(NamedTuple):
+    rank: int
+    clan: str
+    tag: str
+    xp: int
+    max_players: int
+
+    @property
+    def key(self) -> str:
+        return self.tag
+
+    @property
+    def value(self) -> int:
+        return self.xp
+
+    @property
+    def xp_per_player(self) -> float:
+        return self.xp / self.max_players if self.max_players else 0
+
+
+class PlayerEntry(NamedTuple):
+    rank: int
+    name: str
+    value: float
+
+    @property
+    def key(self) -> str:
+        return self.name
+
+
+Entry = Union[ClanEntry, PlayerEntry]
+
+
+class LeaderboardModel:
+    """Typed view of one leaderboard payload.
+
+    The API returns a list of single-key dicts ({category: [entries]}). This
+    maps each category to a tuple of typed entries in rank order, with a
+    key -> rank index per category (clan tag for TopClans, player name
+    otherwise). Search indexes are built lazily once per model.
+    """
+
+    def __init__(self, version: int, categories: Dict[str, Tuple[Entry, ...]]):
+        self.version = version
+        self.categories = categories
+        self.rank_index: Dict[str, Dict[str, int]] = {}  # category -> key -> rank
+        for category, entries in categories.items():
+            index = {}
+            for entry in entries:
+                index.setdefault(entry.key, entry.rank)
+            self.rank_index[category] = index
+        self._search_indexes: Dict[str, SearchIndex] = {}
+
+    @staticmethod
+    def from_payload(payload: List[dict], version: int) -> "LeaderboardModel":
+        categories = {}
+        for item in payload:
+            for category, entries in item.items():
+                if category == CLANS_CATEGORY:
+                    categories[category] = tuple(
+                        ClanEntry(rank, clan["Clan"], clan["Tag"], int(clan["XP"]), int(clan["MaxPlayers"]))
+                        for rank, clan in enumerate(entries, start=1)
+                    )
+                else:
+                    categories[category] = tuple(
+                        PlayerEntry(rank, player["Name"], float(player["Value"]))
+                        for rank, player in enumerate(entries, start=1)
+                    )
+        return LeaderboardModel(version, categories)
+
+    def __contains__(self, category: str) -> bool:
+        return category in self.categories
+
+    @property
+    def clans(self) -> Tuple[ClanEntry, ...]:
+        return self.categories.get(CLANS_CATEGORY, ())
+
+    def rank(self, category: str, key: str) -> int:
+        """Returns the rank of key in category, or 0 if it isn't ranked."""
+        return self.rank_index.get(category, {}).get(key, 0)
+
+    def entry(self, category: str, key: str) -> Optional[Entry]:
+        rank = self.rank(category, key)
+        return self.categories[category][rank - 1] if rank else None
+
+    def search_index(self, category: str) -> SearchIndex:
+        if category not in self._search_indexes:
+            index = SearchIndex()
+            for entry in self.categories[category]:
+                if isinstance(entry, ClanEntry):
+                    index.add(entry.rank, (entry.clan, entry.tag), entry)
+                else:
+                    index.add(entry.rank, (entry.name,), entry)
+            self._search_indexes[category] = index
+        return self._search_indexes[category]
@@ -5,8 +5,8 @@ import os
 import logging
 import asyncio
 import logging.handlers
-from aiohttp import ClientSession
 from bot import CustomBot
+from http_client import create_session
 import sys
 
 load_dotenv()
@@ -40,7 +40,7 @@ async def main():
     intents.guild_reactions = True
     intents.guilds = True
 
-    async with ClientSession() as session:
+    async with create_session() as session:
         bot = CustomBot(
             commands.when_mentioned_or("!"),
             intents=intents,
@@ -49,4 +49,6 @@ async def main():
 
         await bot.start(TOKEN)
 
-asyncio.run(main())
+# Guarded so worker processes spawned by the cogs can import this module
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+from google.cloud.firestore_v1 import Client, DocumentSnapshot
+from google.cloud.firestore_v1.base_query import FieldFilter
+from typing import Any, Dict, Optional, Tuple
+import logging
+import threading
+import time
+
+log = logging.getLogger("ProfileCache")
+
+CACHE_TTL_SECONDS = 15 * 60  # Bounds staleness for external edits the listener doesn't see
+PLAIN_TYPES = (str, int, float, bool, list, dict, type(None))  # Values that can be applied to the cached copy
+
+
+class ProfileCache:
+    """Read-through cache of profile documents, keyed by steam_id (the document id).
+
+    Profiles are loaded lazily with point reads and kept with a
+    discord_id -> steam_id index, so the discord_id query only runs once per
+    user. Writes made through the cache update it directly. A snapshot
+    listener on profiles whose last_updated is newer than the cache picks up
+    edits made outside the bot; anything else expires after
+    CACHE_TTL_SECONDS. The listener runs in a Firestore thread, hence the lock.
+    """
+
+    def __init__(self, db: Client, collection: str):
+        self.collection = db.collection(collection)
+        self.lock = threading.Lock()
+        self.profiles: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}  # steam_id -> (loaded at, data or None)
+        self.discord_index: Dict[int, Tuple[float, Optional[str]]] = {}  # discord_id -> (loaded at, steam_id or None)
+        self.hits = 0
+        self.misses = 0
+        self.listener_updates = 0
+        self.watch = None
+
+    def start_listener(self) -> None:
+        started_at = int(time.time())
+        query = self.collection.where(filter=FieldFilter("last_updated", ">=", started_at))
+        self.watch = query.on_snapshot(self._on_snapshot)
+
+    def stop_listener(self) -> None:
+        if self.watch is not None:
+            self.watch.unsubscribe()
+            self.watch = None
+
+    def _on_snapshot(self, snapshots, changes, read_time) -> None:
+        for change in changes:
+            document = change.document
+            if change.type.name == "REMOVED":
+                self.invalidate(document.id)
+            else:
+                self._store(document.id, document.to_dict())
+            self.listener_updates += 1
+
+    def _fresh(self, loaded_at: float) -> bool:
+        return time.monotonic() - loaded_at < CACHE_TTL_SECONDS
+
+    def _store(self, steam_id: str, data: Optional[Dict[str, Any]]) -> None:
+        now = time.monotonic()
+        with self.lock:
+            previous = self.profiles.get(steam_id, (0, None))[1]
+            if previous and previous.get("discord_id"):
+                self.discord_index.pop(previous["discord_id"], None)
+            self.profiles[steam_id] = (now, data)
+            if data and data.get("discord_id"):
+                self.discord_index[data["discord_id"]] = (now, steam_id)
+
+    def invalidate(self, steam_id: str) -> None:
+        with self.lock:
+            _, data = self.profiles.pop(steam_id, (0, None))
+            if data and data.get("discord_id"):
+                self.discord_index.pop(data["discord_id"], None)
+
+    def get(self, steam_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the profile with steam_id, or None if there is none."""
+        cached = self.profiles.get(steam_id)
+        if cached and self._fresh(cached[0]):
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        snapshot: DocumentSnapshot = self.collection.document(steam_id).get()
+        data = snapshot.to_dict() if snapshot.exists else None
+        self._store(steam_id, data)
+        return data
+
+    def get_by_discord_id(self, discord_id: int) -> Optional[Dict[str, Any]]:
+        """Returns the profile linked to discord_id, or None if there is none."""
+        cached = self.discord_index.get(discord_id)
+        if cached and self._fresh(cached[0]):
+            if cached[1] is None:
+                self.hits += 1
+                return None
+            return self.get(cached[1])
+
+        self.misses += 1
+        snapshots = self.collection.where(filter=FieldFilter("discord_id", "==", discord_id)).limit(1).get()
+        if not snapshots:
+            with self.lock:
+                self.discord_index[discord_id] = (time.monotonic(), None)
+            return None
+        self._store(snapshots[0].id, snapshots[0].to_dict())
+        return snapshots[0].to_dict()
+
+    def exists(self, steam_id: str) -> bool:
+        return self.get(steam_id) is not None
+
+    def set(self, steam_id: str, data: Dict[str, Any]) -> None:
+        """Writes a whole profile and caches it."""
+        self.collection.document(steam_id).set(data)
+        self._store(steam_id, dict(data))
+
+    def update(self, steam_id: str, fields: Dict[str, Any]) -> None:
+        """Updates fields of a profile and applies them to the cached copy.
+
+        Field paths and server-side transforms (ArrayUnion, ...) can't be
+        applied locally, so they invalidate the cached copy instead.
+        """
+        self.collection.document(steam_id).update(fields)
+        cached = self.profiles.get(steam_id)
+        local = all("." not in key and isinstance(value, PLAIN_TYPES) for key, value in fields.items())
+        if cached and cached[1] is not None and local:
+            self._store(steam_id, {**cached[1], **fields})
+        else:
+            self.invalidate(steam_id)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": f"{self.hits / lookups:.1%}" if lookups else "n/a",
+            "profiles": len(self.profiles),
+            "discord_ids": len(self.discord_index),
+            "listener_updates": self.listener_updates,
+        }
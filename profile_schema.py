@@ -0,0 +1,172 @@
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+import re
+
+MAX_BIO_LENGTH = 600
+COLOR_PATTERN = r'^#[0-9A-Fa-f]{6}$'  # Hex color validation
+ALLOWED_MEMBERSHIP_TYPES = ["Member", "Founder"]
+TWITTER_URL_PATTERN = r'^https?://(www\.)?(twitter|x)\.com/[A-Za-z0-9_]{1,15}/?$'
+YOUTUBE_URL_PATTERN = r'^https?://(www\.|m\.)?youtube\.com/(channel/[\w-]+|c/[\w.-]+|user/[\w.-]+|@[\w.-]+)/?$'
+TWITCH_URL_PATTERN = r'^https?://(www\.)?twitch\.tv/[A-Za-z0-9_]{3,25}/?$'
+
+TYPE_NAMES = {str: "str", int: "int", float: "float", bool: "bool", list: "list"}
+
+
+class Field(NamedTuple):
+    """Declarative constraints for one profile field.
+
+    Types are checked exactly (type(value) in types), so booleans aren't
+    accepted as integers. Every constraint is optional.
+    """
+    types: Tuple[type, ...]
+    min: Optional[Union[int, float]] = None  # Inclusive
+    max: Optional[Union[int, float]] = None  # Inclusive
+    max_length: Optional[int] = None
+    pattern: Optional[str] = None
+    pattern_hint: str = ""  # Shown when the pattern doesn't match, e.g. "a valid hex color (e.g., #FF0000)"
+    choices: Optional[List[Any]] = None
+    allow_empty: bool = False  # Empty string is accepted regardless of pattern
+    required: bool = False
+    not_in_future: bool = False  # Unix timestamps that can't be later than now
+    note: str = ""  # Appended to the type in the schema description
+
+
+Schema = Dict[str, Union[Field, "Schema"]]
+
+PROFILE_SCHEMA: Schema = {
+    "bio": Field((str,), max_length=MAX_BIO_LENGTH),
+    "accent_color": Field((str,), pattern=COLOR_PATTERN, pattern_hint="a valid hex color (e.g., #FF0000)"),
+    "twitter_profile_url": Field((str,), pattern=TWITTER_URL_PATTERN, pattern_hint="a Twitter/X profile URL", allow_empty=True),
+    "youtube_profile_url": Field((str,), pattern=YOUTUBE_URL_PATTERN, pattern_hint="a YouTube channel URL", allow_empty=True),
+    "twitch_profile_url": Field((str,), pattern=TWITCH_URL_PATTERN, pattern_hint="a Twitch channel URL", allow_empty=True),
+    "join_date": Field((int,), min=0, not_in_future=True, note="Unix timestamp"),
+    "membership_type": Field((str,), choices=ALLOWED_MEMBERSHIP_TYPES, note="Member or Founder"),
+    "stats": {
+        "m200_kills": Field((int,)),
+        "l96_kills": Field((int,)),
+        "rem700_kills": Field((int,)),
+        "sv98_kills": Field((int,)),
+        "msr_kills": Field((int,)),
+        "ssg69_kills": Field((int,)),
+        "total_kills": Field((int,)),
+        "kdr": Field((float, int), min=0, max=100),
+        "kpm": Field((float, int), min=0, max=100),
+        "time_played": Field((int, float), min=0, max=1000000),
+        "score": Field((int,)),
+        "prestige": Field((int,), min=0, max=10),
+        "level": Field((int,), min=0, max=200),
+    }
+}
+
+
+def describe_schema(schema: Schema) -> Dict[str, Any]:
+    """Returns the human readable type of every field, e.g. {"kdr": "float | int"}."""
+    description = {}
+    for name, field in schema.items():
+        if isinstance(field, dict):
+            description[name] = describe_schema(field)
+        else:
+            type_name = " | ".join(TYPE_NAMES[t] for t in field.types)
+            description[name] = f"{type_name} ({field.note})" if field.note else type_name
+    return description
+
+
+PROFILE_SCHEMA_STR = describe_schema(PROFILE_SCHEMA)
+
+
+def _compile_fields(schema: Schema, source: str, path: str, lines: List[str], constants: Dict[str, Any],
+                    indent: str) -> None:
+    """Appends the checks for schema, applied to the dict named source, to lines."""
+    def constant(prefix: str, value: Any) -> str:
+        name = f"{prefix}_{len(constants)}"
+        constants[name] = value
+        return name
+
+    def check(condition: str, message: Optional[str]) -> None:
+        # Checks of one field form an if/elif chain, so only its first failure is reported
+        lines.append(f"{indent}elif {condition}:")
+        lines.append(f"{indent}    {f'errors.append({message!r})' if message else 'pass'}")
+
+    known = constant("KNOWN", frozenset(schema))
+    lines.append(f"{indent}for key in {source}:")
+    lines.append(f"{indent}    if key not in {known}:")
+    lines.append(f"{indent}        errors.append(f'Unknown field: {path}{{key}}')")
+
+    for name, field in schema.items():
+        label = f"{path}{name}"
+        value = constant("v", None)
+        lines.append(f"{indent}{value} = {source}.get({name!r}, MISSING)")
+        lines.append(f"{indent}if {value} is MISSING:")
+        required = isinstance(field, Field) and field.required
+        missing_message = f"{label} is required"
+        lines.append(f"{indent}    {f'errors.append({missing_message!r})' if required else 'pass'}")
+
+        if isinstance(field, dict):
+            check(f"type({value}) is not dict", f"{label} must be a dictionary")
+            lines.append(f"{indent}else:")
+            _compile_fields(field, value, f"{label}.", lines, constants, indent + "    ")
+            continue
+
+        type_name = " | ".join(TYPE_NAMES[t] for t in field.types)
+        check(f"type({value}) not in {constant('TYPES', field.types)}", f"{label} must be of type {type_name}")
+        if field.allow_empty:
+            check(f"{value} == ''", None)
+        if field.max_length is not None:
+            check(f"len({value}) > {field.max_length}", f"{label} must be less than {field.max_length} characters")
+        if field.pattern is not None:
+            match = constant("PATTERN", re.compile(field.pattern).match)
+            check(f"not {match}({value})", f"{label} must be {field.pattern_hint or field.pattern}")
+        if field.choices is not None:
+            choices = constant("CHOICES", frozenset(field.choices))
+            check(f"{value} not in {choices}", f"{label} must be one of: {', '.join(field.choices)}")
+        if field.min is not None and field.max is not None:
+            check(f"not {field.min!r} <= {value} <= {field.max!r}",
+                  f"{label} must be between {field.min} and {field.max} (inclusive)")
+        elif field.min is not None:
+            check(f"{value} < {field.min!r}",
+                  f"{label} cannot be negative" if field.min == 0 else f"{label} cannot be less than {field.min}")
+        elif field.max is not None:
+            check(f"{value} > {field.max!r}", f"{label} cannot be more than {field.max}")
+        if field.not_in_future:
+            check(f"{value} > now", f"{label} cannot be in the future")
+
+
+def compile_validator(schema: Schema) -> Callable[[Any, Optional[int]], List[str]]:
+    """Compiles schema into a function returning every error of a profile, or [] if it's valid.
+
+    The schema is turned into straight-line Python source once, so validating
+    costs a handful of dict lookups and type checks per field with no
+    schema walking. The function takes the current Unix time as an optional
+    second argument, which bulk validation passes once for all profiles.
+    """
+    lines = [
+        "def validate(data, now=None):",
+        "    if type(data) is not dict:",
+        "        return ['Invalid data format']",
+        "    if now is None:",
+        "        now = current_time()",
+        "    errors = []",
+    ]
+    constants: Dict[str, Any] = {
+        "MISSING": object(),
+        "current_time": lambda: int(datetime.now(timezone.utc).timestamp()),
+    }
+    _compile_fields(schema, "data", "", lines, constants, "    ")
+    lines.append("    return errors")
+
+    namespace = dict(constants)
+    exec(compile("\n".join(lines), "<profile validator>", "exec"), namespace)
+    return namespace["validate"]
+
+
+validate_profile = compile_validator(PROFILE_SCHEMA)
+
+
+def validate_profiles(profiles: Iterable[Any], validate: Callable[[Any, Optional[int]], List[str]] = validate_profile
+                      ) -> Iterator[Tuple[int, List[str]]]:
+    """Bulk mode for imports and audits: yields (index, errors) for every invalid profile."""
+    now = int(datetime.now(timezone.utc).timestamp())
+    for index, profile in enumerate(profiles):
+        errors = validate(profile, now)
+        if errors:
+            yield index, errors
@@ -0,0 +1,135 @@
+from profile_schema import validate_profiles
+from typing import IO, Any, Dict, Iterator, List, NamedTuple, Tuple
+import gzip
+import io
+import json
+import re
+import zipfile
+
+STEAM_ID_PATTERN = re.compile(r'^\d{17}$')
+IMPORT_BATCH_SIZE = 500  # Rows validated and written together, one Firestore WriteBatch
+MAX_IMPORT_LINE_BYTES = 64 * 1024  # A full profile is ~1 KB, anything much longer isn't one
+MAX_IMPORT_UNCOMPRESSED_BYTES = 512 * 1024 * 1024  # Zip bomb guard, checked against the declared member sizes
+# Fields the bot stores next to the profile schema. Exports include them, imports drop them and start over
+STORED_FIELDS = frozenset({
+    "discord_id", "discord_username", "banner_url", "banner_variants", "soundtrack_url", "last_updated",
+    "steam_username", "aliases", "date", "next_check", "last_checked", "check_interval",
+})
+
+
+class ImportFileError(Exception):
+    """Raised when an import file can't be read at all."""
+
+
+class ImportBatch(NamedTuple):
+    rows: List[Tuple[str, str, Dict[str, Any]]]  # (location, steam_id, profile) of every valid row
+    invalid: List[Tuple[str, List[str]]]  # (location, errors) of every invalid row
+
+
+def _iter_lines(file: IO[bytes], name: str) -> Iterator[Tuple[str, Any]]:
+    """Yields (location, parsed row or error message) for every non-empty line of a JSONL file."""
+    for number, line in enumerate(iter(lambda: file.readline(MAX_IMPORT_LINE_BYTES + 1), b""), start=1):
+        location = f"{name}:{number}"
+        if len(line) > MAX_IMPORT_LINE_BYTES:
+            # Skip the rest of the oversized line
+            while line and not line.endswith(b"\n"):
+                line = file.readline(MAX_IMPORT_LINE_BYTES + 1)
+            yield location, f"Line is longer than {MAX_IMPORT_LINE_BYTES // 1024} KB"
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield location, json.loads(line)
+        except ValueError:  # JSONDecodeError and UnicodeDecodeError
+            yield location, "Invalid JSON"
+
+
+def _iter_gzip_lines(file: IO[bytes], name: str) -> Iterator[Tuple[str, Any]]:
+    """Like _iter_lines for a gzip compressed file, such as an export."""
+    with gzip.GzipFile(fileobj=file, mode="rb") as unpacked:
+        try:
+            for row in _iter_lines(unpacked, name):
+                # A gzip file doesn't reliably declare its size, so the zip bomb guard counts what's unpacked
+                if unpacked.tell() > MAX_IMPORT_UNCOMPRESSED_BYTES:
+                    raise ImportFileError(f"the file unpacks to more than {MAX_IMPORT_UNCOMPRESSED_BYTES // 1024 // 1024} MB")
+                yield row
+        except (OSError, EOFError) as e:  # BadGzipFile, or a truncated file
+            raise ImportFileError(f"not a valid gzip file ({e})")
+
+
+def iter_import_rows(file: IO[bytes], filename: str) -> Iterator[Tuple[str, Any]]:
+    """Yields (location, parsed row or error message) for every row of a .jsonl file, a .jsonl.gz export or a .zip of .jsonl files.
+
+    Compressed files are decompressed as they're read, one line at a time,
+    so neither the file nor its members are ever held in memory as a whole.
+    """
+    if filename.lower().endswith(".gz"):
+        yield from _iter_gzip_lines(file, filename)
+        return
+    if not filename.lower().endswith(".zip"):
+        yield from _iter_lines(file, filename)
+        return
+
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile:
+        raise ImportFileError("not a valid zip file")
+    with archive:
+        members = [info for info in archive.infolist() if not info.is_dir() and info.filename.lower().endswith(".jsonl")]
+        if not members:
+            raise ImportFileError("the zip file contains no .jsonl files")
+        if sum(info.file_size for info in members) > MAX_IMPORT_UNCOMPRESSED_BYTES:
+            raise ImportFileError(f"the zip file unpacks to more than {MAX_IMPORT_UNCOMPRESSED_BYTES // 1024 // 1024} MB")
+        for info in members:
+            with archive.open(info) as member:
+                yield from _iter_lines(member, info.filename)
+
+
+def iter_import_batches(rows: Iterator[Tuple[str, Any]], batch_size: int = IMPORT_BATCH_SIZE) -> Iterator[ImportBatch]:
+    """Groups rows into batches and validates them with the bulk profile validator.
+
+    Each row is a profile as accepted by /admin-create-profile plus its
+    "steam_id", or a row of an export: its STORED_FIELDS are dropped. Rows
+    repeating an earlier Steam ID of the file are invalid.
+    """
+    seen = set()
+    while True:
+        chunk = []
+        invalid = []
+        for location, row in rows:
+            if isinstance(row, str):
+                invalid.append((location, [row]))
+            elif type(row) is not dict or type(row.get("steam_id")) is not str or not STEAM_ID_PATTERN.match(row["steam_id"]):
+                invalid.append((location, ["steam_id must be a 17 digit Steam ID"]))
+            elif row["steam_id"] in seen:
+                invalid.append((location, [f"Duplicate steam_id {row['steam_id']}"]))
+            else:
+                steam_id = row.pop("steam_id")
+                seen.add(steam_id)
+                chunk.append((location, steam_id, {key: value for key, value in row.items() if key not in STORED_FIELDS}))
+            if len(chunk) + len(invalid) >= batch_size:
+                break
+
+        if not chunk and not invalid:
+            return
+        errors = dict(validate_profiles(row for _, _, row in chunk))
+        invalid.extend((chunk[index][0], row_errors) for index, row_errors in errors.items())
+        valid = [row for index, row in enumerate(chunk) if index not in errors]
+        yield ImportBatch(valid, invalid)
+
+
+class ExportWriter:
+    """Writes profiles as gzip compressed JSONL to a file, one page at a time."""
+
+    def __init__(self, file: IO[bytes]):
+        self.gzip = gzip.GzipFile(fileobj=file, mode="wb")
+        self.text = io.TextIOWrapper(self.gzip, encoding="utf-8", newline="\n")
+        self.count = 0
+
+    def write(self, steam_id: str, profile: Dict[str, Any]) -> None:
+        # default=str covers Firestore timestamps and references
+        self.text.write(json.dumps({"steam_id": steam_id, **profile}, ensure_ascii=False, default=str) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        self.text.close()  # Also closes the GzipFile, writing its trailer, but not the underlying file
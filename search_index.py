@@ -0,0 +1,146 @@
+from collections import Counter
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+from rapidfuzz import fuzz, process
+
+NGRAM_SIZE = 2
+
+
+def normalize(text: str) -> str:
+    """Lowercases and collapses whitespace so scoring never has to."""
+    return " ".join(str(text).lower().split())
+
+
+def ngrams(text: str, n: int = NGRAM_SIZE) -> Set[str]:
+    """Returns the padded character n-grams of every token in text."""
+    grams = set()
+    for token in text.split():
+        padded = f" {token} "
+        if len(padded) <= n:
+            grams.add(padded)
+            continue
+        for i in range(len(padded) - n + 1):
+            grams.add(padded[i:i + n])
+    return grams
+
+
+class SearchIndex:
+    """Fuzzy search index over short names.
+
+    Every entry has a key, a payload and one or more searchable texts (e.g. a
+    clan name and its tag). Texts are normalized once on insert and an n-gram
+    posting list is kept so a query only scores entries sharing at least one
+    n-gram with it. Scoring is done in one batched rapidfuzz call.
+
+    Large indexes can set max_candidates: only that many texts, the ones
+    sharing the most n-grams with the query, are scored then.
+    """
+
+    def __init__(self, ngram_size: int = NGRAM_SIZE, max_candidates: Optional[int] = None):
+        self.ngram_size = ngram_size
+        self.max_candidates = max_candidates
+        self._texts: Dict[int, str] = {}  # text id -> normalized text
+        self._owners: Dict[int, Hashable] = {}  # text id -> entry key
+        self._postings: Dict[str, Set[int]] = {}  # n-gram -> text ids
+        self._entries: Dict[Hashable, Tuple[Any, List[int]]] = {}  # key -> (payload, text ids)
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def add(self, key: Hashable, texts: Iterable[str], payload: Any = None) -> None:
+        """Adds or replaces the entry stored under key."""
+        if key in self._entries:
+            self.remove(key)
+
+        text_ids = []
+        for text in texts:
+            if not text:
+                continue
+            normalized = normalize(text)
+            text_id = self._next_id
+            self._next_id += 1
+            self._texts[text_id] = normalized
+            self._owners[text_id] = key
+            for gram in ngrams(normalized, self.ngram_size):
+                self._postings.setdefault(gram, set()).add(text_id)
+            text_ids.append(text_id)
+
+        self._entries[key] = (payload, text_ids)
+
+    def remove(self, key: Hashable) -> None:
+        """Removes the entry stored under key, if any."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        for text_id in entry[1]:
+            normalized = self._texts.pop(text_id)
+            del self._owners[text_id]
+            for gram in ngrams(normalized, self.ngram_size):
+                postings = self._postings.get(gram)
+                if postings is None:
+                    continue
+                postings.discard(text_id)
+                if not postings:
+                    del self._postings[gram]
+
+    def _candidates(self, query: str) -> Dict[int, str]:
+        if self.max_candidates is not None:
+            return self._top_candidates(query)
+
+        candidate_ids = set()
+        for gram in ngrams(query, self.ngram_size):
+            candidate_ids.update(self._postings.get(gram, ()))
+
+        # Queries sharing no n-gram with anything (typos in very short names)
+        # fall back to scoring every text rather than returning nothing.
+        if not candidate_ids:
+            return self._texts
+        return {text_id: self._texts[text_id] for text_id in candidate_ids}
+
+    def _top_candidates(self, query: str) -> Dict[int, str]:
+        shared = Counter()
+        for gram in ngrams(query, self.ngram_size):
+            shared.update(self._postings.get(gram, ()))
+
+        # Scoring every text is only a fallback while that's within the cap
+        if not shared:
+            return self._texts if len(self._texts) <= self.max_candidates else {}
+        if len(shared) > self.max_candidates:
+            shared = dict(shared.most_common(self.max_candidates))
+        return {text_id: self._texts[text_id] for text_id in shared}
+
+    def search(self, query: str, limit: int = 10, min_similarity: float = 0.6) -> List[Tuple[float, Any]]:
+        """Returns up to limit (similarity, payload) pairs, best match first.
+
+        Similarity is the token set ratio in [0, 1]. An entry with several
+        texts scores as its best matching text.
+        """
+        query = normalize(query)
+        if not query or not self._texts or limit <= 0:
+            return []
+
+        # Scores are rounded to whole percents like fuzzywuzzy did, so the
+        # cutoff is widened by half a point before rounding.
+        matches = process.extract(
+            query,
+            self._candidates(query),
+            scorer=fuzz.token_set_ratio,
+            score_cutoff=max(min_similarity * 100 - 0.5, 0),
+            limit=None,
+        )
+
+        best: Dict[Hashable, float] = {}
+        for _, score, text_id in matches:
+            score = round(score)
+            if score < min_similarity * 100:
+                continue
+            key = self._owners[text_id]
+            if score > best.get(key, -1):
+                best[key] = score
+
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(score / 100, self._entries[key][0]) for key, score in ranked]
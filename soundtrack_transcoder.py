@@ -0,0 +1,125 @@
+from typing import Awaitable, Callable, NamedTuple, Union
+import asyncio
+import logging
+import os
+import sys
+
+log = logging.getLogger("SoundtrackTranscoder")
+
+FFMPEG_PATH = os.getenv("FFMPEG_PATH", "ffmpeg")
+SOUNDTRACK_MAX_SECONDS = 180
+SOUNDTRACK_BITRATE = "128k"
+SOUNDTRACK_MAX_BYTES = 4 * 1024 * 1024  # 128 kbit/s for 180s is ~2.9 MB, with room for container overhead
+LOUDNESS_FILTER = "loudnorm=I=-16:TP=-1.5:LRA=11"  # EBU R128, -16 LUFS like most streaming sites
+TRANSCODE_TIMEOUT_SECONDS = 120
+TRANSCODE_WORKERS = 2
+TRANSCODE_QUEUE_SIZE = 20
+
+
+class TranscodeError(Exception):
+    """Raised when a soundtrack can't be transcoded."""
+
+
+class TranscodeJob(NamedTuple):
+    name: str  # For logs, e.g. the Steam ID
+    fetch: Callable[[], Awaitable[bytes]]  # Reads the uploaded file when a worker picks the job up
+    done: Callable[[Union[bytes, Exception]], Awaitable[None]]  # Gets the MP3, or the error
+
+
+async def transcode(data: bytes) -> bytes:
+    """Transcodes an audio file to a loudness normalized MP3 of at most SOUNDTRACK_MAX_SECONDS.
+
+    ffmpeg reads from stdin and writes to stdout, so no temporary files are
+    involved. Metadata, cover art and other streams are dropped.
+    """
+    process = await asyncio.create_subprocess_exec(
+        FFMPEG_PATH, "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-t", str(SOUNDTRACK_MAX_SECONDS),
+        "-map", "0:a:0", "-map_metadata", "-1",
+        "-af", LOUDNESS_FILTER,
+        "-ac", "2", "-ar", "44100",
+        "-c:a", "libmp3lame", "-b:a", SOUNDTRACK_BITRATE,
+        "-f", "mp3", "pipe:1",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        output, errors = await asyncio.wait_for(process.communicate(data), TRANSCODE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise TranscodeError(f"transcoding took longer than {TRANSCODE_TIMEOUT_SECONDS}s")
+
+    if process.returncode != 0 or not output:
+        message = errors.decode(errors="replace").strip().splitlines()
+        raise TranscodeError(message[-1] if message else f"ffmpeg exited with code {process.returncode}")
+    if len(output) > SOUNDTRACK_MAX_BYTES:
+        raise TranscodeError(f"transcoded soundtrack is {len(output) // 1024} KiB, over the limit")
+    return output
+
+
+class SoundtrackTranscoder:
+    """Bounded job queue served by TRANSCODE_WORKERS worker tasks.
+
+    Each worker fetches the upload, runs ffmpeg in a subprocess and hands
+    the result to the job's done callback. Only jobs being worked on hold
+    their file in memory; queued jobs only hold the fetch callable.
+    """
+
+    def __init__(self, workers: int = TRANSCODE_WORKERS, queue_size: int = TRANSCODE_QUEUE_SIZE):
+        self.queue: asyncio.Queue[TranscodeJob] = asyncio.Queue(queue_size)
+        self.worker_count = workers
+        self.workers = []
+        self.completed = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        self.workers = [asyncio.create_task(self._work()) for _ in range(self.worker_count)]
+
+    def stop(self) -> None:
+        for worker in self.workers:
+            worker.cancel()
+
+    def submit(self, job: TranscodeJob) -> bool:
+        """Queues a job. Returns False if the queue is full."""
+        try:
+            self.queue.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _work(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                result = await transcode(await job.fetch())
+                self.completed += 1
+            except Exception as e:
+                log.warning(f"Failed to transcode soundtrack {job.name}: {e}")
+                self.failed += 1
+                result = e
+            try:
+                await job.done(result)
+            except Exception as e:
+                log.error(f"Error publishing soundtrack {job.name}: {e}")
+            finally:
+                self.queue.task_done()
+
+
+async def _transcode_file(input_path: str, output_path: str) -> None:
+    with open(input_path, "rb") as f:
+        data = f.read()
+    output = await transcode(data)
+    with open(output_path, "wb") as f:
+        f.write(output)
+    print(f"{input_path}: {len(data) // 1024} KiB -> {output_path}: {len(output) // 1024} KiB")
+
+
+if __name__ == "__main__":
+    # Offline check without Discord or Firebase: python soundtrack_transcoder.py input.wav output.mp3
+    # samples/ has a short WAV and MP3 that transcode, and a non-audio file that raises TranscodeError
+    if len(sys.argv) != 3:
+        sys.exit("usage: python soundtrack_transcoder.py <input> <output.mp3>")
+    asyncio.run(_transcode_file(sys.argv[1], sys.argv[2]))
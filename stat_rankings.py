@@ -0,0 +1,121 @@
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class StatRankings:
+    """Rankings of profiles by each of their stats, kept sorted as profiles change.
+
+    Every stat has a list of (-value, steam_id) in rank order and a parallel
+    list of -value, so ranks and percentiles are found by bisection in
+    O(log n) and the top N is a slice. Updating a profile moves only its own
+    entries. Every stat has a version that's bumped whenever its ranking or a
+    name in it changes, so rendered tables can be cached against it.
+    """
+
+    def __init__(self, stats: Iterable[str]):
+        self.stats = list(stats)
+        self._entries: Dict[str, List[Tuple[float, str]]] = {stat: [] for stat in self.stats}
+        self._keys: Dict[str, List[float]] = {stat: [] for stat in self.stats}  # -value of each entry
+        self._values: Dict[str, Dict[str, float]] = {}  # steam_id -> stat -> value
+        self._names: Dict[str, str] = {}  # steam_id -> display name
+        self.versions: Dict[str, int] = {stat: 0 for stat in self.stats}
+
+    @classmethod
+    def build(cls, stats: Iterable[str], profiles: Iterable[Tuple[str, Any, str]]) -> "StatRankings":
+        """Builds rankings from (steam_id, stats, name) of every profile, sorting each stat once."""
+        rankings = cls(stats)
+        for steam_id, profile_stats, name in profiles:
+            values = rankings._parse(profile_stats)
+            if values:
+                rankings._values[steam_id] = values
+            rankings._names[steam_id] = name
+        for stat in rankings.stats:
+            entries = sorted((-values[stat], steam_id) for steam_id, values in rankings._values.items() if stat in values)
+            rankings._entries[stat] = entries
+            rankings._keys[stat] = [key for key, _ in entries]
+        return rankings
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def _parse(self, stats: Any) -> Dict[str, float]:
+        """Returns the rankable stats; ones that are missing or aren't numbers are left out."""
+        stats = stats if isinstance(stats, dict) else {}
+        return {
+            stat: float(stats[stat]) for stat in self.stats
+            if type(stats.get(stat)) in (int, float) and stats[stat] == stats[stat]  # Not NaN
+        }
+
+    def _remove_entry(self, stat: str, steam_id: str, value: float) -> None:
+        index = bisect_left(self._entries[stat], (-value, steam_id))
+        del self._entries[stat][index]
+        del self._keys[stat][index]
+
+    def _insert_entry(self, stat: str, steam_id: str, value: float) -> None:
+        index = bisect_left(self._entries[stat], (-value, steam_id))
+        self._entries[stat].insert(index, (-value, steam_id))
+        self._keys[stat].insert(index, -value)
+
+    def update(self, steam_id: str, stats: Any, name: Optional[str] = None) -> None:
+        """Sets the stats of a profile, replacing all of its previous ones."""
+        values = self._parse(stats)
+        previous = self._values.get(steam_id, {})
+        for stat in self.stats:
+            if previous.get(stat) == values.get(stat):
+                continue
+            if stat in previous:
+                self._remove_entry(stat, steam_id, previous[stat])
+            if stat in values:
+                self._insert_entry(stat, steam_id, values[stat])
+            self.versions[stat] += 1
+
+        if values:
+            self._values[steam_id] = values
+        else:
+            self._values.pop(steam_id, None)
+        if name is not None:
+            self.set_name(steam_id, name)
+
+    def set_name(self, steam_id: str, name: str) -> None:
+        if self._names.get(steam_id) == name:
+            return
+        self._names[steam_id] = name
+        for stat in self._values.get(steam_id, ()):
+            self.versions[stat] += 1
+
+    def remove(self, steam_id: str) -> None:
+        self.update(steam_id, {})
+        self._names.pop(steam_id, None)
+
+    def name(self, steam_id: str) -> str:
+        return self._names.get(steam_id) or steam_id
+
+    def count(self, stat: str) -> int:
+        return len(self._entries[stat])
+
+    def top(self, stat: str, n: int) -> List[Tuple[int, str, float]]:
+        """Returns (rank, steam_id, value) of the n best profiles. Tied profiles share a rank."""
+        keys = self._keys[stat]
+        return [(bisect_left(keys, key) + 1, steam_id, -key) for key, steam_id in self._entries[stat][:n]]
+
+    def rank(self, stat: str, steam_id: str) -> Optional[int]:
+        """Returns the rank of a profile, 1 being the best, or None if it isn't ranked."""
+        value = self._values.get(steam_id, {}).get(stat)
+        if value is None:
+            return None
+        return bisect_left(self._keys[stat], -value) + 1
+
+    def percentile(self, stat: str, steam_id: str) -> Optional[float]:
+        """Returns the share of ranked profiles, in [0, 1], with the same or a lower value."""
+        value = self._values.get(steam_id, {}).get(stat)
+        if value is None:
+            return None
+        keys = self._keys[stat]
+        return (len(keys) - bisect_left(keys, -value)) / len(keys)
+
+    def value_at_percentile(self, stat: str, percentile: float) -> Optional[float]:
+        """Returns the lowest value within the best share of profiles given by percentile, e.g. 0.1 for the top 10%."""
+        keys = self._keys[stat]
+        if not keys:
+            return None
+        return -keys[min(len(keys) - 1, max(0, int(len(keys) * percentile) - 1))]
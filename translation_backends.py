@@ -0,0 +1,227 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+import aiohttp
+import asyncio
+import json
+import logging
+import os
+import time
+from deep_translator import GoogleTranslator
+from translation_executor import TranslationExecutor
+from translation_cache import normalize_text
+from http_client import HttpClient
+
+log = logging.getLogger("TranslationBackends")
+
+TRANSLATION_BACKENDS = os.getenv("TRANSLATION_BACKENDS", "google,dictionary")  # Comma separated, in priority order
+LIBRETRANSLATE_URL = os.getenv("LIBRETRANSLATE_URL", "http://localhost:5000")
+LIBRETRANSLATE_API_KEY = os.getenv("LIBRETRANSLATE_API_KEY")
+DICTIONARY_PATH = os.getenv(
+    "TRANSLATION_DICTIONARY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "translation_dictionary.json"),
+)
+HTTP_TIMEOUT_SECONDS = 10
+LATENCY_WINDOW = 200  # Recent latencies kept per backend
+MIN_HEDGE_SAMPLES = 20  # Latencies needed before the p95 is trusted
+DEFAULT_HEDGE_DELAY = 2.0
+MIN_HEDGE_DELAY = 0.2
+
+
+class TranslationUnavailable(Exception):
+    """Raised by a backend that can't translate the given text."""
+
+
+class TranslationBackend(ABC):
+    """Base class for translation backends, with latency and error tracking."""
+
+    name = "backend"
+
+    def __init__(self):
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.errors = 0
+
+    async def translate(self, text: str, target: str) -> str:
+        self.requests += 1
+        start = time.perf_counter()
+        try:
+            result = await self._translate(text, target)
+        except Exception:
+            self.errors += 1
+            raise
+        self.latencies.append(time.perf_counter() - start)
+        return result
+
+    @abstractmethod
+    async def _translate(self, text: str, target: str) -> str:
+        """Translates text to the target language code, or raises TranslationUnavailable."""
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Returns the given latency percentile in seconds, or None without enough samples."""
+        if len(self.latencies) < MIN_HEDGE_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * percentile), len(ordered) - 1)]
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.percentile(0.5)
+        p95 = self.percentile(0.95)
+        return {
+            f"{self.name}_requests": self.requests,
+            f"{self.name}_errors": self.errors,
+            f"{self.name}_p50_ms": round(p50 * 1000) if p50 is not None else "n/a",
+            f"{self.name}_p95_ms": round(p95 * 1000) if p95 is not None else "n/a",
+        }
+
+
+class DeepTranslatorBackend(TranslationBackend):
+    """Google Translate through deep_translator, run in the blocking executor."""
+
+    name = "google"
+
+    def __init__(self, executor: TranslationExecutor):
+        super().__init__()
+        self.executor = executor
+
+    async def _translate(self, text: str, target: str) -> str:
+        return await self.executor.run(self._translate_blocking, text, target)
+
+    def _translate_blocking(self, text: str, target: str) -> str:
+        return GoogleTranslator(source="auto", target=target).translate(text)
+
+
+class HttpTranslationBackend(TranslationBackend):
+    """Any LibreTranslate compatible HTTP endpoint, including a self-hosted one."""
+
+    name = "libretranslate"
+
+    def __init__(self, client: HttpClient, url: str = LIBRETRANSLATE_URL,
+                 api_key: Optional[str] = LIBRETRANSLATE_API_KEY):
+        super().__init__()
+        self.client = client
+        self.url = url.rstrip("/")
+        self.api_key = api_key
+
+    async def _translate(self, text: str, target: str) -> str:
+        body = {"q": text, "source": "auto", "target": target.split("-")[0], "format": "text"}
+        if self.api_key:
+            body["api_key"] = self.api_key
+        timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT_SECONDS)
+        # Not retried, the hedged translator moves on to the next backend instead
+        response = await self.client.post(f"{self.url}/translate", endpoint=self.name, json=body, timeout=timeout)
+        if response.status != 200:
+            raise TranslationUnavailable(f"{self.name} returned status {response.status}")
+        return response.json()["translatedText"]
+
+
+class DictionaryBackend(TranslationBackend):
+    """Offline phrasebook of common short messages, loaded from a JSON file.
+
+    The file maps a target language to {normalized phrase: translation}.
+    Anything not in the phrasebook raises TranslationUnavailable.
+    """
+
+    name = "dictionary"
+
+    def __init__(self, path: str = DICTIONARY_PATH):
+        super().__init__()
+        self.phrases: Dict[str, Dict[str, str]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.phrases = json.load(f)
+        else:
+            log.warning(f"Translation dictionary {path} not found, dictionary backend is empty")
+
+    async def _translate(self, text: str, target: str) -> str:
+        translation = self.phrases.get(target, {}).get(normalize_text(text).lower().strip(" !.?"))
+        if translation is None:
+            raise TranslationUnavailable(f"'{text}' is not in the {target} dictionary")
+        return translation
+
+
+def create_backends(client: HttpClient, executor: TranslationExecutor,
+                    names: str = TRANSLATION_BACKENDS) -> List[TranslationBackend]:
+    factories = {
+        DeepTranslatorBackend.name: lambda: DeepTranslatorBackend(executor),
+        HttpTranslationBackend.name: lambda: HttpTranslationBackend(client),
+        DictionaryBackend.name: lambda: DictionaryBackend(),
+    }
+    backends = []
+    for name in names.split(","):
+        name = name.strip()
+        if name not in factories:
+            log.warning(f"Unknown translation backend {name}")
+            continue
+        backends.append(factories[name]())
+    return backends
+
+
+class HedgedTranslator:
+    """Translates through an ordered list of backends with hedged requests.
+
+    The first backend is started right away. If it hasn't answered within its
+    own p95 latency, or as soon as it fails, the next backend is started too;
+    the first successful answer wins and the others are cancelled. If every
+    backend fails, the error of the highest priority backend is raised.
+    """
+
+    def __init__(self, backends: List[TranslationBackend]):
+        if not backends:
+            raise ValueError("At least one translation backend is required")
+        self.backends = backends
+        self.name = "+".join(backend.name for backend in backends)
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self, backend: TranslationBackend) -> float:
+        p95 = backend.percentile(0.95)
+        return DEFAULT_HEDGE_DELAY if p95 is None else max(p95, MIN_HEDGE_DELAY)
+
+    async def translate(self, text: str, target: str) -> str:
+        tasks: Dict[asyncio.Task, TranslationBackend] = {}
+        errors: Dict[TranslationBackend, Exception] = {}
+        next_backend = 0
+
+        def start_next() -> None:
+            nonlocal next_backend
+            backend = self.backends[next_backend]
+            next_backend += 1
+            tasks[asyncio.create_task(backend.translate(text, target))] = backend
+
+        start_next()
+        try:
+            while tasks:
+                can_hedge = next_backend < len(self.backends)
+                delay = self.hedge_delay(self.backends[next_backend - 1]) if can_hedge else None
+                done, _ = await asyncio.wait(tasks, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Slower than the p95 of the last started backend, fire the next one
+                    self.hedges += 1
+                    start_next()
+                    continue
+
+                for task in done:
+                    backend = tasks.pop(task)
+                    if task.exception() is None:
+                        if backend is not self.backends[0]:
+                            self.hedge_wins += 1
+                        return task.result()
+                    errors[backend] = task.exception()
+                    log.warning(f"Translation backend {backend.name} failed: {task.exception()}")
+
+                # A failure falls back to the next backend without waiting for the hedge delay
+                if next_backend < len(self.backends):
+                    start_next()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        raise next(errors[backend] for backend in self.backends if backend in errors)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"hedges": self.hedges, "hedge_wins": self.hedge_wins}
+        for backend in self.backends:
+            stats.update(backend.stats())
+        return stats
@@ -0,0 +1,142 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+log = logging.getLogger("TranslationCache")
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "translation_cache.sqlite3")
+MEMORY_CACHE_SIZE = 2048  # Entries kept in the in-memory LRU
+DISK_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64 MiB of translated text in SQLite
+EVICTION_BATCH = 256  # Rows evicted at a time once the disk cache is over its size
+
+CacheKey = Tuple[str, str, str]  # (text hash, target language, backend)
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes unicode and whitespace so trivially different messages share an entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text: str, target: str, backend: str) -> CacheKey:
+    text_hash = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return text_hash, target, backend
+
+
+class TranslationCache:
+    """Translation cache with an in-memory LRU in front of a SQLite store.
+
+    The SQLite store survives restarts and is kept under max_bytes of
+    translated text by evicting the least recently used rows. SQLite calls
+    are blocking and run in a worker thread.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, memory_size: int = MEMORY_CACHE_SIZE,
+                 max_bytes: int = DISK_CACHE_MAX_BYTES):
+        self.memory: OrderedDict[CacheKey, str] = OrderedDict()
+        self.memory_size = memory_size
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "text_hash TEXT NOT NULL, target TEXT NOT NULL, backend TEXT NOT NULL, "
+            "translation TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (text_hash, target, backend))"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+        self.connection.commit()
+        self.disk_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM translations").fetchone()[0]
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, text: str, target: str, backend: str) -> Optional[str]:
+        key = cache_key(text, target, backend)
+        translation = self.memory.get(key)
+        if translation is not None:
+            self.memory.move_to_end(key)
+            self.memory_hits += 1
+            return translation
+
+        translation = await asyncio.to_thread(self._disk_get, key)
+        if translation is None:
+            self.misses += 1
+            return None
+
+        self.disk_hits += 1
+        self._memory_set(key, translation)
+        return translation
+
+    async def set(self, text: str, target: str, backend: str, translation: str) -> None:
+        key = cache_key(text, target, backend)
+        self._memory_set(key, translation)
+        try:
+            await asyncio.to_thread(self._disk_set, key, translation)
+        except sqlite3.Error as e:
+            log.warning(f"Failed to persist translation: {e}")
+
+    def _memory_set(self, key: CacheKey, translation: str) -> None:
+        self.memory[key] = translation
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def _disk_get(self, key: CacheKey) -> Optional[str]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT translation FROM translations WHERE text_hash = ? AND target = ? AND backend = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                "UPDATE translations SET last_used = ? WHERE text_hash = ? AND target = ? AND backend = ?",
+                (time.time(), *key)
+            )
+            self.connection.commit()
+            return row[0]
+
+    def _disk_set(self, key: CacheKey, translation: str) -> None:
+        size = len(translation.encode("utf-8"))
+        with self.lock:
+            previous = self.connection.execute(
+                "SELECT size FROM translations WHERE text_hash = ? AND target = ? AND backend = ?", key
+            ).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO translations (text_hash, target, backend, translation, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, translation, size, time.time())
+            )
+            self.disk_bytes += size - (previous[0] if previous else 0)
+
+            while self.disk_bytes > self.max_bytes:
+                evicted = self.connection.execute(
+                    "DELETE FROM translations WHERE rowid IN "
+                    "(SELECT rowid FROM translations ORDER BY last_used LIMIT ?) RETURNING size",
+                    (EVICTION_BATCH,)
+                ).fetchall()
+                if not evicted:
+                    break
+                self.disk_bytes -= sum(row[0] for row in evicted)
+            self.connection.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": f"{(self.memory_hits + self.disk_hits) / lookups:.1%}" if lookups else "n/a",
+            "memory_entries": len(self.memory),
+            "disk_mib": round(self.disk_bytes / 1024 / 1024, 2),
+        }
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
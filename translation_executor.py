@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+import asyncio
+import logging
+import time
+
+log = logging.getLogger("TranslationExecutor")
+
+MAX_WORKERS = 8
+MAX_CONCURRENCY = 8
+REQUEST_TIMEOUT_SECONDS = 10
+
+
+class TranslationExecutor:
+    """Runs blocking translation calls in a bounded thread pool.
+
+    At most max_concurrency calls run at once; the others wait on a semaphore
+    and are counted as queued. Each call is bounded by timeout seconds. A
+    timed out call is abandoned by the caller, but its thread keeps running
+    until the underlying HTTP request returns.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_concurrency: int = MAX_CONCURRENCY,
+                 timeout: float = REQUEST_TIMEOUT_SECONDS):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translator")
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.timeout = timeout
+        self.queued = 0
+        self.in_flight = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.total_seconds = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Runs fn(*args) in the pool and returns its result.
+
+        Raises asyncio.TimeoutError if it takes longer than the timeout.
+        """
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await asyncio.wait_for(loop.run_in_executor(self.pool, fn, *args), self.timeout)
+            self.completed += 1
+            return result
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            log.warning(f"Translation call timed out after {self.timeout}s")
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.total_seconds += time.perf_counter() - start
+            self.in_flight -= 1
+            self.semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed + self.timed_out
+        return {
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "avg_latency_ms": round(self.total_seconds / finished * 1000, 1) if finished else 0,
+        }
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,147 @@
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+import re
+import unicodedata
+
+DETECTION_CACHE_SIZE = 4096
+DETECTION_SAMPLE_CHARS = 600  # Only the start of long messages is looked at
+MIN_DETECTION_WORDS = 3  # Shorter messages are never short-circuited
+MIN_STOPWORD_SHARE = 0.2  # Share of words that must be stopwords of the detected language
+MIN_STOPWORD_MARGIN = 2.0  # Best language must score this many times the runner-up
+MIN_SCRIPT_SHARE = 0.8  # Share of letters that must be in the detected script
+
+TOKEN_PATTERN = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+NOISE_PATTERN = re.compile(r"https?://\S+|<[@#:a]?[!&]?\w*:?\d+>|`[^`]*`")
+SENTENCE_PATTERN = re.compile(r"((?<=[.!?…。！？])\s+|\s*\n\s*)")
+
+# Scripts that map to a single language in the emoji mapping, keyed by a
+# prefix of the unicodedata character name
+SCRIPT_LANGUAGES: Tuple[Tuple[str, str], ...] = (
+    ("HANGUL", "ko"),
+    ("HIRAGANA", "ja"),
+    ("KATAKANA", "ja"),
+    ("CJK", "zh-CN"),
+    ("THAI", "th"),
+    ("GREEK", "el"),
+    ("ARMENIAN", "hy"),
+    ("HEBREW", "iw"),
+    ("ETHIOPIC", "am"),
+    ("BENGALI", "bn"),
+    ("DEVANAGARI", "hi"),
+)
+
+# Most frequent function words per language, for Latin and Cyrillic text
+STOPWORDS: Dict[str, FrozenSet[str]] = {
+    language: frozenset(words.split())
+    for language, words in {
+        "en": "the and is are was were you your it this that of to in for with have has not what but be i we they "
+              "he she my me do don't can will just on at so if",
+        "fr": "le la les des est et une un je tu il nous vous ils pas que qui pour avec dans sur ce cette mais "
+              "mon ton son ne suis c'est j'ai du au",
+        "de": "der die das und ist nicht ich du wir ihr sie ein eine mit auf für den dem zu es auch noch aber "
+              "wie was hat habe bin sind",
+        "es": "el la los las es y que en un una por para con no lo pero como más muy yo tú está estoy son "
+              "hay del al se",
+        "pt": "o a os as é e que em um uma por para com não mas como mais muito eu você está estou são tem "
+              "do da dos das no na",
+        "it": "il lo la gli le è e che in un una per con non ma come più molto io tu sono hai ho del della "
+              "nel sul questo",
+        "nl": "de het een en is niet ik jij je we wij zij van op met voor dat die maar ook zijn heb heeft "
+              "wat er nog",
+        "pl": "i w nie na to jest się że z do jak ale co tak już ja ty my czy jestem będzie tylko jego "
+              "mnie dla",
+        "sv": "och är att det en ett inte jag du vi de som på med för har var men till av om så kan",
+        "tr": "ve bir bu da de ne için ben sen biz çok ama gibi daha var yok mı mi değil olarak ile şey",
+        "cs": "a je to se na že v z do jak ale co tak už já ty my jsem není jsou by jeho pro",
+        "ro": "și este că în un o pe cu nu la de ce eu tu noi sunt mai dar pentru fost",
+        "hu": "a az és hogy nem is egy van de meg már csak mint ez az én te mi vagy volt",
+        "fi": "ja on ei se että minä sinä me he mutta kuin niin kun ole oli tämä myös jos",
+        "id": "dan yang di ini itu tidak saya kamu kita ada dengan untuk dari ke akan sudah juga bisa apa",
+        "ru": "и в не на что я ты мы он она это как но все так да нет же вы бы по из у за",
+        "uk": "і в не на що я ти ми він вона це як але все так та ні же ви би по з у за є",
+    }.items()
+}
+
+
+def _script_language(text: str) -> Optional[str]:
+    """Returns the language of text if it's written in a script only one supported language uses."""
+    letters = [char for char in text if char.isalpha()]
+    if not letters:
+        return None
+
+    counts: Dict[str, int] = {}
+    for char in letters:
+        if char < "\u0250" or "\u0400" <= char < "\u0530":  # Latin and Cyrillic are left to stopwords
+            continue
+        name = unicodedata.name(char, "")
+        for prefix, language in SCRIPT_LANGUAGES:
+            if name.startswith(prefix):
+                counts[language] = counts.get(language, 0) + 1
+                break
+
+    # Japanese mixes kanji with kana, so any kana at all makes Han text Japanese
+    if counts.get("ja") and counts.get("zh-CN"):
+        counts["ja"] += counts.pop("zh-CN")
+
+    if not counts:
+        return None
+    language, count = max(counts.items(), key=lambda item: item[1])
+    return language if count / len(letters) >= MIN_SCRIPT_SHARE else None
+
+
+def _stopword_language(text: str) -> Optional[str]:
+    """Returns the language whose stopwords clearly dominate text, if any."""
+    words = TOKEN_PATTERN.findall(text.lower())
+    if len(words) < MIN_DETECTION_WORDS:
+        return None
+
+    scores = sorted(
+        ((sum(word in stopwords for word in words), language) for language, stopwords in STOPWORDS.items()),
+        reverse=True,
+    )
+    (best, language), (runner_up, _) = scores[0], scores[1]
+    if best / len(words) < MIN_STOPWORD_SHARE or best < runner_up * MIN_STOPWORD_MARGIN:
+        return None
+    return language
+
+
+@lru_cache(maxsize=DETECTION_CACHE_SIZE)
+def detect_language(text: str) -> Optional[str]:
+    """Cheap, conservative language detection using the codes of the emoji mapping.
+
+    Returns None whenever the language isn't clear, so callers only skip a
+    translation when the text is almost certainly in the target language.
+    """
+    text = NOISE_PATTERN.sub(" ", text[:DETECTION_SAMPLE_CHARS])
+    return _script_language(text) or _stopword_language(text)
+
+
+def split_into_chunks(text: str, max_chars: int) -> List[str]:
+    """Splits text into chunks, at sentence boundaries when possible.
+
+    Sentences and lines are packed greedily and each chunk keeps the
+    whitespace that follows it, so "".join(chunks) == text. That trailing
+    whitespace may take a chunk over max_chars; only chunk.rstrip() is
+    bounded by it, so callers with a hard limit strip the chunks. A sentence
+    longer than max_chars is cut at its last space that fits, or hard cut.
+    """
+    if len(text) <= max_chars:
+        return [text]
+
+    chunks: List[str] = []
+    current = ""
+    pieces = SENTENCE_PATTERN.split(text)
+    # pieces alternates sentence, separator, sentence, ...
+    for sentence, separator in zip(pieces[::2], pieces[1::2] + [""]):
+        piece = sentence + separator
+        if current and len(current) + len(sentence) > max_chars:
+            chunks.append(current)
+            current = ""
+        while len(current) + len(sentence) > max_chars:
+            cut = piece.rfind(" ", 0, max_chars) + 1 or max_chars
+            chunks.append(piece[:cut])
+            piece, sentence = piece[cut:], sentence[cut:]
+        current += piece
+    if current:
+        chunks.append(current)
+    return chunks